@@ -0,0 +1,61 @@
+# benchmarks/bench_kline_parser.py - PARSER DE KLINES: DataFrame vs array estructurado
+import os
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from kline_store import parse_klines
+
+KLINE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+                 'quote_asset_volume', 'number_of_trades', 'taker_buy_base', 'taker_buy_quote', 'ignore']
+
+
+def make_payload(n=404, start=1_700_000_000_000, step=1_800_000):
+    """Payload sintético con el mismo formato que GET /api/v3/klines"""
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    rows = []
+    for i in range(n):
+        t = start + i * step
+        c = close[i]
+        rows.append([t, f"{c * 0.999:.8f}", f"{c * 1.004:.8f}", f"{c * 0.995:.8f}", f"{c:.8f}",
+                     f"{rng.random() * 1000:.8f}", t + step - 1, f"{rng.random() * 1e5:.8f}",
+                     int(rng.integers(1, 500)), f"{rng.random() * 500:.8f}", f"{rng.random() * 5e4:.8f}", "0"])
+    return rows
+
+
+def parse_dataframe(rows):
+    """Camino anterior de get_klines + to_heikin_ashi (sin el cálculo HA)"""
+    df = pd.DataFrame(rows, columns=KLINE_COLUMNS)
+    df = df.astype({'open': float, 'high': float, 'low': float, 'close': float})
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df.set_index('open_time', inplace=True)
+    return df.copy()
+
+
+def measure(func, rows, number=200):
+    seconds = min(timeit.repeat(lambda: func(rows), number=number, repeat=5)) / number
+    tracemalloc.start()
+    func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak / 1024
+
+
+def main():
+    for n in (100, 404, 1000):
+        rows = make_payload(n)
+        df_us, df_kb = measure(parse_dataframe, rows)
+        np_us, np_kb = measure(parse_klines, rows)
+        print(f"{n:>5} velas | DataFrame: {df_us:8.1f} µs {df_kb:8.1f} KiB | "
+              f"parse_klines: {np_us:8.1f} µs {np_kb:8.1f} KiB | "
+              f"x{df_us / np_us:.1f} más rápido, {df_kb / np_kb:.1f}x menos memoria "
+              f"(resultado {parse_klines(rows).nbytes / 1024:.1f} KiB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Archivo: api_metrics.py
+import bisect
+import inspect
+import json
+import os
+import threading
+import time
+
+from request_scheduler import ENDPOINT_WEIGHTS
+
+# ✅ LÍMITES SUPERIORES DE LOS BUCKETS DEL HISTOGRAMA (ms); el último recoge el resto
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class EndpointStats:
+    """Histograma de latencia, errores por código y peso de un endpoint"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.weight = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.errors = {}  # código (o tipo de excepción) -> veces
+
+    def record(self, elapsed_ms, weight, error=None):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.weight += weight
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def percentile(self, q):
+        """Percentil aproximado: límite superior del bucket que lo contiene (acotado al máximo)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                bound = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+                return round(min(float(bound), self.max_ms), 1)
+        return self.max_ms
+
+    def summary(self):
+        labels = [f"<={b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 1),
+            'avg_ms': round(self.total_ms / self.count, 1) if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max_ms, 1),
+            'weight': self.weight,
+            'errors': dict(self.errors),
+            'histogram': dict(zip(labels, self.buckets))
+        }
+
+
+class ApiMetrics:
+    """Métricas por endpoint de todas las llamadas al cliente Binance"""
+
+    def __init__(self, path="api_metrics.json", dump_seconds=300):
+        self.path = path
+        self.dump_seconds = dump_seconds
+        self.dumped_at = 0.0
+        self.started_at = time.time()
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed_ms, weight=1, error=None):
+        with self._lock:
+            stats = self.endpoints.get(name)
+            if stats is None:
+                stats = self.endpoints[name] = EndpointStats()
+            stats.record(elapsed_ms, weight, error)
+
+    def summary(self):
+        """Resumen por endpoint, ordenado por tiempo total (el que domina el ciclo primero)"""
+        with self._lock:
+            items = [(name, stats.summary()) for name, stats in self.endpoints.items()]
+        items.sort(key=lambda item: item[1]['total_ms'], reverse=True)
+        return dict(items)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.started_at = time.time()
+
+    def dump(self, path=None):
+        """Guarda el resumen en JSON (escritura atómica)"""
+        path = path or self.path
+        data = {'started_at': self.started_at, 'dumped_at': time.time(), 'endpoints': self.summary()}
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Error guardando {path}: {e}")
+        self.dumped_at = data['dumped_at']
+        return data
+
+    def maybe_dump(self):
+        """Volcado periódico (llamado al final de cada ciclo del bot)"""
+        if self.dump_seconds and time.time() - self.dumped_at >= self.dump_seconds:
+            self.dump()
+
+
+def _error_code(exc):
+    """Código de Binance (-1013, -2010...) o nombre de la excepción de red"""
+    code = getattr(exc, 'code', None)
+    return str(code) if code is not None else type(exc).__name__
+
+
+class InstrumentedClient:
+    """Proxy del cliente (síncrono o AsyncClient): mide cada llamada real a la API"""
+
+    def __init__(self, client, metrics):
+        self._client = client
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_') or name == 'close_connection':
+            return attr
+        weight = ENDPOINT_WEIGHTS.get(name, 1)
+        metrics = self._metrics
+
+        if inspect.iscoroutinefunction(attr):
+            async def instrumented(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await attr(*args, **kwargs)
+                except Exception as e:
+                    metrics.record(name, (time.perf_counter() - start) * 1000, weight, _error_code(e))
+                    raise
+                metrics.record(name, (time.perf_counter() - start) * 1000, weight)
+                return result
+        else:
+            def instrumented(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = attr(*args, **kwargs)
+                except Exception as e:
+                    metrics.record(name, (time.perf_counter() - start) * 1000, weight, _error_code(e))
+                    raise
+                metrics.record(name, (time.perf_counter() - start) * 1000, weight)
+                return result
+        instrumented.__name__ = name
+        return instrumented
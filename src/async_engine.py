@@ -0,0 +1,289 @@
+# Archivo: async_engine.py
+import asyncio
+import threading
+import time
+
+from binance.client import AsyncClient
+from binance.exceptions import BinanceAPIException
+from api_metrics import InstrumentedClient
+from client_factory import scheduler, metrics
+from config import API_KEY, API_SECRET, SYMBOLS, TIMEFRAMES, UPDATE_INTERVAL, MIN_TRADE_DIFF, TRADING_ENABLED
+from price_book import INVALID_SYMBOL
+from request_scheduler import AsyncScheduledClient
+
+NOT_CONNECTED = "Motor asyncio no conectado"
+
+
+class AsyncTradingEngine:
+    """Motor asyncio: descarga, señales y órdenes de cada símbolo como tareas de un único event loop"""
+
+    def __init__(self, manager, account, indicators, interval=UPDATE_INTERVAL):
+        self.manager = manager
+        self.account = account
+        self.indicators = indicators
+        self.interval = interval
+        self.aclient = None
+        self.loop = None
+        self.thread = None
+        self._main_task = None
+        self._ready = threading.Event()
+        self._connected = threading.Event()  # Hay sesión con AsyncClient (no durante la espera de reintento)
+        self._cash = 0.0
+        self._cash_lock = None
+        self._rebalance_lock = None  # Un solo ciclo a la vez (periódico o manual desde la GUI)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Arranca el event loop en su propio hilo (uno solo, para todos los símbolos)"""
+        if self.running:
+            return False
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="AsyncEngine")
+        self.thread.start()
+        self._ready.wait(timeout=10)
+        return True
+
+    def stop(self, timeout=3.0):
+        """Cancela la tarea principal: las peticiones en vuelo se interrumpen al momento"""
+        if self.loop and self._main_task and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self._main_task.cancel)
+            except RuntimeError:
+                pass  # El loop ya se cerró
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._main_task = self.loop.create_task(self._main())
+            self._ready.set()
+            self.loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._ready.set()
+            self.loop.close()
+
+    async def _main(self):
+        self._cash_lock = asyncio.Lock()
+        self._rebalance_lock = asyncio.Lock()
+        # ✅ COMO EL BUCLE CON HILOS: UN FALLO (conexión, cliente) SE REGISTRA Y SE REINTENTA
+        while True:
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                print("✅ Motor asyncio detenido")
+                raise
+            except Exception as e:
+                print(f"Error in async engine: {e}")
+                self._log(f"❌ Error en motor asyncio: {e} - reintentando en 10s", 'RED')
+                await asyncio.sleep(10)
+
+    async def _session(self):
+        """Un AsyncClient y el bucle periódico de rebalanceo sobre él"""
+        client = await AsyncClient.create(API_KEY, API_SECRET)
+        # ✅ MISMO PRESUPUESTO DE RATE LIMIT QUE EL CLIENTE SÍNCRONO
+        self.aclient = AsyncScheduledClient(InstrumentedClient(client, metrics), scheduler)
+        self._connected.set()
+        try:
+            while True:
+                try:
+                    if self.manager.gui is not None:
+                        await self.rebalance()
+                        metrics.maybe_dump()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error in async engine: {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            self._connected.clear()
+            self.aclient = None
+            await client.close_connection()
+
+    def rebalance_threadsafe(self, manual=False, timeout=60):
+        """Rebalanceo pedido desde otro hilo (p. ej. botón de la GUI), ejecutado dentro del loop"""
+        if not self._connected.is_set():
+            return NOT_CONNECTED
+        future = asyncio.run_coroutine_threadsafe(self.rebalance(manual), self.loop)
+        return future.result(timeout=timeout)
+
+    async def refresh_account(self):
+        """Balances y lote de precios por el AsyncClient, cargados en la foto y el PriceBook compartidos"""
+        snapshot = self.account.snapshot
+        if not snapshot.stream_backed or not snapshot.updated_at:
+            snapshot.set_account(await self.aclient.get_account())
+        balances = snapshot.get()
+        price_book = self.account.price_book
+        price_book.track(self.account.valuation_symbols(balances))
+        symbols = sorted(price_book.tracked)
+        if symbols:
+            try:
+                tickers = await self.aclient.get_symbol_ticker(symbols=price_book.symbols_param(symbols))
+            except BinanceAPIException as e:
+                if e.code != INVALID_SYMBOL:
+                    raise
+                price_book.drop_unconfirmed()
+                tickers = await self.aclient.get_symbol_ticker(
+                    symbols=price_book.symbols_param(sorted(price_book.tracked)))
+            price_book.load(tickers)
+        return balances
+
+    async def rebalance(self, manual=False):
+        """Ciclo completo; los ciclos periódico y manual nunca se solapan (comparten self._cash)"""
+        async with self._rebalance_lock:
+            if self.aclient is None:
+                return NOT_CONNECTED  # Sesión cerrada mientras el ciclo esperaba turno
+            return await self._rebalance(manual)
+
+    async def _rebalance(self, manual):
+        manager = self.manager
+        manager.update_cooldowns()
+
+        # ✅ CUENTA Y PRECIOS: DOS PETICIONES PARA TODO EL CICLO; DESPUÉS SOLO LECTURAS EN MEMORIA
+        balances = await self.refresh_account()
+        total_usd = self.total_usd(balances)
+        if total_usd <= 0:
+            return "No capital"
+        self._cash = balances.get('USDC', {}).get('free', 0.0)
+
+        # ✅ FILTROS DE EXCHANGE EN UN HILO: LAS ÓRDENES NUNCA DESCARGAN exchangeInfo DENTRO DEL LOOP
+        filters = self.account.filters
+        if any(symbol not in filters.filters for symbol in SYMBOLS):
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, filters.refresh)
+            except Exception as e:
+                print(f"⚠️ Error cargando filtros de exchange: {e}")
+
+        actions = []
+
+        # ✅ UNA TAREA DE DESCARGA POR SÍMBOLO
+        results = await self._gather(SYMBOLS, [self.fetch_symbol_data(symbol, balances) for symbol in SYMBOLS])
+        market_data = dict(zip(SYMBOLS, results))
+
+        # ✅ PLAN VECTORIZADO (mismo planificador que el motor con hilos)
+        plan = manager.build_plan(market_data, total_usd, self._cash, manual, actions)
+
+        # ✅ VENTAS CONCURRENTES PRIMERO (suman su USDC a la caja), DESPUÉS COMPRAS CONCURRENTES
+        sells, buys = plan.sells(), plan.buys()
+        await self._gather([symbol for symbol, _, _ in sells],
+                           [self.sell(symbol, abs(usd) / price, price, plan.decided_at) for symbol, usd, price in sells])
+        await self._gather([symbol for symbol, _, _ in buys],
+                           [self.buy(symbol, usd, price, plan.decided_at) for symbol, usd, price in buys])
+
+        return manager.finish_rebalance(actions)
+
+    async def _gather(self, symbols, tasks):
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                print(f"Error processing {symbol}: {result}")
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    def total_usd(self, balances):
+        """Valor de la cuenta con la foto y los precios ya cargados por refresh_account (sin red)"""
+        price_book = self.account.price_book
+        total = balances.get('USDC', {}).get('free', 0.0)
+        for symbol in self.account.valuation_symbols(balances):
+            total += balances[symbol[:-len('USDC')]]['free'] * price_book.peek(symbol)
+        return total
+
+    async def fetch_symbol_data(self, symbol, balances):
+        store = self.indicators.store
+        for interval in self.indicators.fetch_intervals():
+            await store.aget(symbol, interval, self.aclient)
+        b = balances.get(symbol[:-len('USDC')])
+        return {
+            'ohlc': self.indicators.get_ohlc(symbol, list(TIMEFRAMES.values()), cached=True),
+            'balance': b['free'] + b['locked'] if b else 0.0,
+            'price': self.account.price_book.peek(symbol)
+        }
+
+    def _missing_filters(self, symbol, side):
+        """Sin filtros para el par (p. ej. no listado): no se opera en vez de descargarlos en el loop"""
+        if symbol in self.account.filters.filters:
+            return None
+        msg = f"❌ ORDEN RECHAZADA {side} {symbol}: sin filtros de exchange"
+        self._log(msg, 'RED')
+        return False, msg
+
+    def _log(self, msg, color):
+        if self.manager.gui:
+            self.manager.gui.log_trade(msg, color)
+
+    async def buy(self, symbol, usd_amount, price, decided_at=None):
+        decided_at = time.perf_counter() if decided_at is None else decided_at
+        if not TRADING_ENABLED:
+            return self.account.buy_market(symbol, usd_amount, decided_at)
+
+        # ✅ RESERVA DEL USDC LOCAL: LAS COMPRAS CONCURRENTES NO GASTAN DOS VECES EL MISMO SALDO
+        async with self._cash_lock:
+            usd_amount = min(usd_amount, self._cash)
+            if usd_amount <= MIN_TRADE_DIFF:
+                msg = f"❌ CAPITAL INSUFICIENTE {symbol}: disponible ${self._cash:.2f}"
+                self._log(msg, 'RED')
+                return False, msg, 0.0
+            self._cash -= usd_amount
+
+        # ✅ COMPRA POR IMPORTE (quoteOrderQty): UNA SOLA PETICIÓN
+        quote_amount = self.account.format_quote(usd_amount)
+        ok, msg = self._missing_filters(symbol, 'BUY') or self.account.check_quote_filters(symbol, quote_amount, 'BUY')
+        if not ok:
+            self._cash += usd_amount
+            return False, msg, 0.0
+        try:
+            order = await self.aclient.order_market_buy(symbol=symbol, quoteOrderQty=quote_amount)
+        except BinanceAPIException as e:
+            self._cash += usd_amount
+            msg = f"❌ ERROR BUY {symbol}: {e.message}"
+            self._log(msg, 'RED')
+            return False, msg, 0.0
+        latency_ms = (time.perf_counter() - decided_at) * 1000
+        self.account.snapshot.apply_fill(symbol, 'BUY', order)
+
+        quantity = float(order.get('executedQty', 0))
+        executed_total = float(order['cummulativeQuoteQty']) if order.get('cummulativeQuoteQty') else quote_amount
+        executed_price = float(order['fills'][0]['price']) if order.get('fills') else price
+        msg = f"🟢 BUY {symbol}: {quantity:.2f} a ${executed_price:.4f} = ${executed_total:.4f} [{latency_ms:.0f} ms]"
+        self._log(msg, 'GREEN')
+        if self.manager.gui:
+            self.manager.gui.force_token_update(symbol)
+        return True, msg, executed_total
+
+    async def sell(self, symbol, quantity, price, decided_at=None):
+        decided_at = time.perf_counter() if decided_at is None else decided_at
+        if not TRADING_ENABLED:
+            return self.account.sell_market(symbol, quantity, decided_at)
+
+        missing = self._missing_filters(symbol, 'SELL')
+        if missing:
+            return missing + (0.0,)
+        quantity = self.account.format_quantity(symbol, quantity)
+        ok, msg = self.account.check_filters(symbol, quantity, price, 'SELL')
+        if not ok:
+            return False, msg, 0.0
+        try:
+            order = await self.aclient.order_market_sell(symbol=symbol, quantity=quantity)
+        except BinanceAPIException as e:
+            msg = f"❌ ERROR VENTA {symbol}: {e.message}"
+            self._log(msg, 'RED')
+            return False, msg, 0.0
+        latency_ms = (time.perf_counter() - decided_at) * 1000
+        self.account.snapshot.apply_fill(symbol, 'SELL', order)
+
+        executed_price = float(order['fills'][0]['price']) if order.get('fills') else price
+        executed_total = float(order['cummulativeQuoteQty']) if order.get('cummulativeQuoteQty') else quantity * price
+        async with self._cash_lock:
+            self._cash += executed_total
+        msg = f"SELL {symbol}:{quantity:.2f} at ${executed_price:.4f}= ${executed_total:.4f} [{latency_ms:.0f} ms]"
+        self._log(msg, 'RED')
+        if self.manager.gui:
+            self.manager.gui.force_token_update(symbol)
+        return True, msg, executed_total
@@ -0,0 +1,369 @@
+# Archivo: backtester.py
+import os
+import time
+
+import numpy as np
+
+from kline_store import parse_klines, MAX_KLINES_PER_REQUEST
+from oo_engine import heikin_ashi_batch, oo_series
+from rebalance_planner import plan_orders
+from strategy_config import TIMEFRAMES, TIMEFRAME_WEIGHTS, MIN_TRADE_DIFF, SYMBOLS, INTERVAL_MINUTES
+from strategy_state import COLOR_FACTORS
+
+# ✅ MISMOS COOLDOWNS QUE CapitalManager.timeframe_to_minutes
+DEFAULT_COOLDOWN_MINUTES = {"30m": 15, "1h": 30, "2h": 60}
+DEFAULT_FEE_RATE = 0.001  # Comisión taker spot (0.1%)
+
+# ✅ SALIDA COLUMNAR
+EQUITY_DTYPE = np.dtype([('time', 'i8'), ('equity', 'f8'), ('cash', 'f8')])
+TRADE_DTYPE = np.dtype([('time', 'i8'), ('symbol', 'i2'), ('side', 'i1'), ('price', 'f8'),
+                        ('quantity', 'f8'), ('usd', 'f8'), ('fee', 'f8')])  # side: 1 compra, -1 venta
+
+
+# ✅ HISTÓRICO: DESCARGA PAGINADA Y ALMACENAMIENTO .npy (KLINE_DTYPE)
+def fetch_history(client, symbol, interval, start_ms, end_ms=None):
+    """Velas [start_ms, end_ms) paginando hacia delante con startTime"""
+    rows = []
+    cursor = start_ms
+    while end_ms is None or cursor < end_ms:
+        params = {'symbol': symbol, 'interval': interval, 'startTime': cursor, 'limit': MAX_KLINES_PER_REQUEST}
+        if end_ms is not None:
+            params['endTime'] = end_ms - 1
+        page = client.get_klines(**params)
+        if not page:
+            break
+        rows.extend(page)
+        cursor = page[-1][0] + 1
+        if len(page) < MAX_KLINES_PER_REQUEST:
+            break
+    return parse_klines(rows)
+
+
+def save_history(history, directory, interval):
+    os.makedirs(directory, exist_ok=True)
+    for symbol, bars in history.items():
+        np.save(os.path.join(directory, f"{symbol}_{interval}.npy"), bars)
+
+
+def load_history(directory, symbols, interval):
+    """{symbol: array KLINE_DTYPE} de los símbolos que tengan fichero"""
+    history = {}
+    for symbol in symbols:
+        path = os.path.join(directory, f"{symbol}_{interval}.npy")
+        if os.path.exists(path):
+            history[symbol] = np.load(path)
+    return history
+
+
+class MarketGrid:
+    """Velas base de todos los símbolos en una rejilla temporal común (S, N), alineada a UTC"""
+
+    def __init__(self, history, base_interval, align_minutes):
+        self.symbols = list(history)
+        self.base_interval = base_interval
+        self.period = INTERVAL_MINUTES[base_interval] * 60_000
+        align = align_minutes * 60_000
+
+        starts = [int(bars['open_time'][0]) for bars in history.values() if len(bars)]
+        ends = [int(bars['open_time'][-1]) for bars in history.values() if len(bars)]
+        if not starts:
+            raise ValueError("Histórico vacío")
+        t0 = -(-min(starts) // align) * align
+        ratio = align // self.period
+        n = (max(ends) - t0) // self.period + 1
+        n -= n % ratio  # Solo buckets completos del timeframe mayor
+        self.times = t0 + np.arange(n, dtype=np.int64) * self.period
+
+        shape = (len(self.symbols), n)
+        self.open, self.high, self.low, self.close = (np.full(shape, np.nan) for _ in range(4))
+        for i, bars in enumerate(history.values()):
+            idx = (bars['open_time'] - t0) // self.period
+            keep = (idx >= 0) & (idx < n)
+            for name in ('open', 'high', 'low', 'close'):
+                getattr(self, name)[i, idx[keep]] = bars[name][keep]
+        self._fill_gaps()
+
+    @classmethod
+    def from_arrays(cls, symbols, base_interval, times, open_, high, low, close):
+        """Rejilla sobre arrays ya alineados (p. ej. adjuntados desde memoria compartida)"""
+        grid = cls.__new__(cls)
+        grid.symbols = list(symbols)
+        grid.base_interval = base_interval
+        grid.period = INTERVAL_MINUTES[base_interval] * 60_000
+        grid.times = times
+        grid.open, grid.high, grid.low, grid.close = open_, high, low, close
+        return grid
+
+    def _fill_gaps(self):
+        """Huecos tras el inicio de cada símbolo → vela plana al último cierre"""
+        valid = ~np.isnan(self.close)
+        idx = np.where(valid, np.arange(self.close.shape[1]), 0)
+        np.maximum.accumulate(idx, axis=1, out=idx)
+        started = np.maximum.accumulate(valid, axis=1)
+        last_close = np.take_along_axis(self.close, idx, axis=1)
+        for name in ('open', 'high', 'low', 'close'):
+            values = getattr(self, name)
+            values[:] = np.where(valid, values, np.where(started, last_close, np.nan))
+
+
+def live_signal_codes(grid, timeframe, length):
+    """Código OO (0/1/2) de `timeframe` al cierre de cada vela base, con la vela mayor en formación
+
+    Equivale a OOEngine: EMAs de las velas cerradas hasta el bucket anterior + un paso con la
+    vela parcial (open del bucket, máximo/mínimo acumulados, cierre actual).
+    """
+    ratio = INTERVAL_MINUTES[timeframe] * 60_000 // grid.period
+    n_symbols, n = grid.close.shape
+    nb = n // ratio
+    shape = (n_symbols, nb, ratio)
+    o, h, l, c = (getattr(grid, name).reshape(shape) for name in ('open', 'high', 'low', 'close'))
+
+    # ✅ VELAS CERRADAS DEL TIMEFRAME Y SU CADENA OO COMPLETA
+    closed = np.stack([o[..., 0], h.max(axis=-1), l.min(axis=-1), c[..., -1]], axis=-1)
+    ha = heikin_ashi_batch(closed)
+    chain = oo_series((ha[..., 1] + ha[..., 2] + ha[..., 3] * 2) / 4, length)
+    count = np.cumsum(~np.isnan(chain['ys1']), axis=-1)
+
+    # ✅ VENTANA DE length-1 VELAS CERRADAS: MEDIA Y SUMA DE CUADRADOS POR BUCKET
+    w = length - 1
+    wmean = np.full((n_symbols, nb), np.nan)
+    wss = np.full((n_symbols, nb), np.nan)
+    if nb >= w:
+        windows = np.lib.stride_tricks.sliding_window_view(chain['ys1'], w, axis=-1)
+        wmean[:, w - 1:] = windows.mean(axis=-1)
+        wss[:, w - 1:] = ((windows - wmean[:, w - 1:, None]) ** 2).sum(axis=-1)
+
+    # ✅ VELA PARCIAL EN CADA VELA BASE
+    p_open = np.repeat(o[..., 0], ratio, axis=-1)
+    p_high = np.maximum.accumulate(h, axis=-1).reshape(n_symbols, n)
+    p_low = np.minimum.accumulate(l, axis=-1).reshape(n_symbols, n)
+    p_close = grid.close
+
+    # ✅ ESTADO CERRADO DEL BUCKET ANTERIOR PARA CADA VELA BASE
+    prev = np.repeat(np.arange(nb) - 1, ratio)
+    has_prev = prev >= 0
+    prev = np.maximum(prev, 0)
+
+    def at_prev(values):
+        return np.where(has_prev, values[:, prev], np.nan)
+
+    prev_raw_open, prev_raw_close = at_prev(closed[..., 0]), at_prev(closed[..., 3])
+    ha_close = (p_open + p_high + p_low + p_close) / 4
+    ha_open = np.where(np.isnan(prev_raw_open), (p_open + p_close) / 2, (prev_raw_open + prev_raw_close) / 2)
+    ha_high = np.fmax(np.fmax(ha_open, ha_close), p_high)
+    ha_low = np.fmin(np.fmin(ha_open, ha_close), p_low)
+    ys1 = (ha_high + ha_low + ha_close * 2) / 4
+
+    prev_count = np.where(has_prev, count[:, prev], 0)
+    m, ss = at_prev(wmean), at_prev(wss)
+    mean_all = (m * w + ys1) / length
+    var = (ss + w * (m - mean_all) ** 2 + (ys1 - mean_all) ** 2) / (length - 1)
+    rk4 = np.where(prev_count >= w, np.sqrt(var), 0.001)
+
+    a = 2.0 / (length + 1)
+    rk3 = a * ys1 + (1 - a) * at_prev(chain['rk3'])
+    rk5 = (ys1 - rk3) * 100 / rk4
+    rk6 = a * rk5 + (1 - a) * at_prev(chain['rk6'])
+    prev_up, prev_down = at_prev(chain['up']), at_prev(chain['down'])
+    up = a * rk6 + (1 - a) * prev_up
+    down = a * up + (1 - a) * prev_down
+
+    # ✅ MISMA CLASIFICACIÓN QUE classify_oo; SIN SUFICIENTES VELAS → RED
+    is_yellow = ((prev_up > up) & (prev_down < down)) | ((prev_up < up) & (prev_down > down))
+    codes = np.where(is_yellow, 1, np.where(up > down, 2, 0)).astype(np.int8)
+    enough = (prev_count >= 1) & (prev_count + 1 >= length) & ~np.isnan(up) & ~np.isnan(down)
+    codes[~enough] = 0
+    return codes
+
+
+def compute_signal_codes(grid, timeframes, length=8):
+    """Códigos (N, S, T) de todos los timeframes (depende solo de `length`)"""
+    return np.stack([live_signal_codes(grid, tf, length) for tf in timeframes], axis=-1).transpose(1, 0, 2)
+
+
+class BacktestResult:
+    """Curva de equity, operaciones y comisiones en forma columnar"""
+
+    def __init__(self, symbols, equity, trades, params):
+        self.symbols = list(symbols)
+        self.equity = equity  # EQUITY_DTYPE
+        self.trades = trades  # TRADE_DTYPE
+        self.params = params
+
+    @property
+    def fees(self):
+        return float(self.trades['fee'].sum())
+
+    def summary(self):
+        curve = self.equity['equity']
+        if not len(curve):
+            return {}
+        peak = np.maximum.accumulate(curve)
+        return {
+            'start_equity': float(curve[0]),
+            'end_equity': float(curve[-1]),
+            'total_return': float(curve[-1] / curve[0] - 1) if curve[0] else 0.0,
+            'max_drawdown': float(((peak - curve) / peak).max()) if peak.max() > 0 else 0.0,
+            'trades': int(len(self.trades)),
+            'fees': self.fees,
+            'turnover': float(self.trades['usd'].sum())
+        }
+
+    def save(self, path):
+        np.savez_compressed(path, symbols=np.array(self.symbols), equity=self.equity, trades=self.trades)
+
+
+def cooldown_weights(codes, nows, tf_weights, cooldown_ms):
+    """Pesos (N, S) con los bloqueos de cooldown de process_signal_changes/update_cooldowns
+
+    Las señales no dependen de la cartera, así que los cooldowns se resuelven de antemano: solo
+    se recorren los cambios de dirección, no las velas. El primer ciclo no registra colores y el
+    segundo solo los guarda, así que los cambios cuentan desde la tercera vela de `codes`.
+    """
+    n, n_symbols, n_tf = codes.shape
+    base = COLOR_FACTORS[codes]
+    mask = np.zeros(codes.shape, dtype=bool)
+    locked = np.zeros(codes.shape)
+
+    # ✅ CAMBIOS DE COLOR POR (símbolo, timeframe) EN ORDEN TEMPORAL
+    s, j, k = np.nonzero((codes[2:] != codes[1:-1]).transpose(1, 2, 0))
+    k += 2
+    if len(k):
+        group = s * n_tf + j
+        current = np.where(codes[k, s, j] > codes[k - 1, s, j], 2, 3)
+        new_group = np.r_[True, group[1:] != group[:-1]]
+        last = np.where(new_group, 0, np.r_[0, current[:-1]])  # Dirección del cambio anterior (0 = ninguna)
+        flip = (last != 0) & (current != last)
+
+        # ✅ CADA GIRO FIJA EL FIN DEL COOLDOWN; SOLO INICIA UN BLOQUEO SI NO HAY UNO VIGENTE
+        s, j, k, group = s[flip], j[flip], k[flip], group[flip]
+        deadline = nows[k] + cooldown_ms[j]
+        first_in_group = np.r_[True, group[1:] != group[:-1]]
+        starts = np.flatnonzero(first_in_group | (np.r_[0.0, deadline[:-1]] <= nows[k]))
+        if len(starts):
+            chain_last = np.r_[starts[1:], len(k)] - 1
+            start_k = k[starts]
+            end_k = np.searchsorted(nows, deadline[chain_last], side='left')  # Primera vela con el cooldown vencido
+            lengths = end_k - start_k
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            rows = np.repeat(start_k, lengths) + offsets
+            cols_s, cols_j = np.repeat(s[starts], lengths), np.repeat(j[starts], lengths)
+            mask[rows, cols_s, cols_j] = True
+            locked[rows, cols_s, cols_j] = np.repeat(tf_weights[j[starts]] * base[start_k, s[starts], j[starts]],
+                                                     lengths)
+
+    # ✅ PESOS CON BLOQUEOS (producto escalar enmascarado, como StrategyState.weights)
+    return np.where(mask, 0.0, base) @ tf_weights + np.where(mask, locked, 0.0).sum(axis=2)
+
+
+def simulate(grid, codes, timeframes, timeframe_weights=TIMEFRAME_WEIGHTS, cooldown_minutes=None,
+             min_trade_diff=MIN_TRADE_DIFF, fee_rate=DEFAULT_FEE_RATE, initial_cash=1000.0, warmup_bars=0):
+    """Pesos y cooldowns vectorizados sobre toda la rejilla; el bucle solo recorre los rebalanceos"""
+    cooldown_minutes = cooldown_minutes or DEFAULT_COOLDOWN_MINUTES
+    n_symbols = len(grid.symbols)
+    tf_weights = np.array([timeframe_weights[tf] for tf in timeframes], dtype=float)
+    cooldown_ms = np.array([cooldown_minutes.get(tf, 15) * 60_000 for tf in timeframes], dtype=float)
+    allocation = 1.0 / n_symbols
+
+    nows = grid.times[warmup_bars:] + grid.period  # Decisión al cierre de cada vela base
+    n = len(nows)
+    all_prices = np.ascontiguousarray(np.nan_to_num(grid.close[:, warmup_bars:]).T)  # (N, S); 0 = sin cotizar
+    weights = cooldown_weights(codes[warmup_bars:], nows, tf_weights, cooldown_ms)
+
+    # ✅ CICLOS QUE OPERAN: EL INICIAL Y LOS QUE CAMBIAN ALGÚN PESO MÁS DE 0.001
+    active = np.abs(np.diff(weights, axis=0, prepend=np.zeros((1, n_symbols)))) > 0.001
+    if n:
+        active[0] = True
+    events = np.flatnonzero(active.any(axis=1)) if initial_cash > 0 else np.zeros(0, dtype=np.intp)
+
+    holdings = np.zeros(n_symbols)
+    cash = float(initial_cash)
+    held = np.zeros((len(events) + 1, n_symbols))  # Cartera tras cada evento (fila 0 = inicial)
+    cash_after = np.full(len(events) + 1, cash)
+    trade_chunks = []
+    for e, k in enumerate(events, 1):
+        prices = all_prices[k]
+        total_usd = cash + (holdings * prices).sum()
+        if total_usd > 0:
+            order = plan_orders(weights[k], prices, holdings, active[k], total_usd, cash,
+                                allocation, min_trade_diff)[3]
+
+            # ✅ VENTAS PRIMERO, DESPUÉS COMPRAS CON LA CAJA REAL (neta de comisiones)
+            sells = order < 0
+            sell_usd = -order[sells]
+            sell_qty = sell_usd / prices[sells]
+            holdings[sells] -= sell_qty
+            cash += float((sell_usd * (1 - fee_rate)).sum())
+
+            wanted = np.where(order > 0, order, 0.0)
+            before = np.cumsum(wanted) - wanted
+            allotted = np.clip(cash - before, 0.0, wanted)
+            buys = allotted > min_trade_diff
+            buy_usd = allotted[buys]
+            buy_qty = buy_usd * (1 - fee_rate) / prices[buys]
+            holdings[buys] += buy_qty
+            cash -= float(buy_usd.sum())
+
+            n_sells, n_buys = len(sell_usd), len(buy_usd)
+            if n_sells or n_buys:
+                chunk = np.zeros(n_sells + n_buys, dtype=TRADE_DTYPE)
+                chunk['time'] = nows[k]
+                chunk['symbol'][:n_sells], chunk['symbol'][n_sells:] = sells.nonzero()[0], buys.nonzero()[0]
+                chunk['side'][:n_sells], chunk['side'][n_sells:] = -1, 1
+                chunk['price'][:n_sells], chunk['price'][n_sells:] = prices[sells], prices[buys]
+                chunk['quantity'][:n_sells], chunk['quantity'][n_sells:] = sell_qty, buy_qty
+                chunk['usd'][:n_sells], chunk['usd'][n_sells:] = sell_usd, buy_usd
+                chunk['fee'] = chunk['usd'] * fee_rate
+                trade_chunks.append(chunk)
+        held[e] = holdings
+        cash_after[e] = cash
+
+    # ✅ CURVA DE EQUITY: CARTERA DEL ÚLTIMO EVENTO VALORADA EN CADA VELA
+    last_event = np.searchsorted(events, np.arange(n), side='right')
+    equity = np.zeros(n, dtype=EQUITY_DTYPE)
+    equity['time'] = nows
+    equity['cash'] = cash_after[last_event]
+    equity['equity'] = equity['cash'] + (held[last_event] * all_prices).sum(axis=1)
+
+    trades = np.concatenate(trade_chunks) if trade_chunks else np.zeros(0, dtype=TRADE_DTYPE)
+    params = {'timeframe_weights': dict(timeframe_weights), 'cooldown_minutes': dict(cooldown_minutes),
+              'min_trade_diff': min_trade_diff, 'fee_rate': fee_rate, 'initial_cash': initial_cash}
+    return BacktestResult(grid.symbols, equity, trades, params)
+
+
+def build_grid(history, timeframes=None):
+    """(rejilla en el timeframe menor, timeframes, velas de calentamiento por defecto)"""
+    timeframes = list(timeframes or TIMEFRAMES.values())
+    base = min(timeframes, key=lambda tf: INTERVAL_MINUTES.get(tf, float('inf')))
+    minutes = [INTERVAL_MINUTES.get(tf) for tf in timeframes]
+    if any(m is None or m % INTERVAL_MINUTES[base] for m in minutes):
+        raise ValueError(f"Timeframes {timeframes} no derivables de {base}")
+    grid = MarketGrid(history, base, max(minutes))
+    warmup_bars = 100 * (max(minutes) // INTERVAL_MINUTES[base])  # Como Indicators.window
+    return grid, timeframes, warmup_bars
+
+
+def run_backtest(history, timeframes=None, length=8, warmup_bars=None, **params):
+    """HA → OO → peso → cooldown → rebalanceo sobre el histórico {symbol: velas base}"""
+    grid, timeframes, default_warmup = build_grid(history, timeframes)
+    codes = compute_signal_codes(grid, timeframes, length)
+    if warmup_bars is None:
+        warmup_bars = default_warmup
+    result = simulate(grid, codes, timeframes, warmup_bars=warmup_bars, **params)
+    result.params['length'] = length
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else "history"
+    base_tf = min(TIMEFRAMES.values(), key=lambda tf: INTERVAL_MINUTES.get(tf, float('inf')))
+    data = load_history(directory, SYMBOLS, base_tf)
+    if not data:
+        print(f"❌ Sin histórico en {directory}/ (<SYMBOL>_{base_tf}.npy)")
+        sys.exit(1)
+    started = time.perf_counter()
+    result = run_backtest(data)
+    print(f"✅ Backtest {len(data)} símbolos en {time.perf_counter() - started:.2f}s")
+    for key, value in result.summary().items():
+        print(f"  {key}: {value}")
@@ -1,28 +1,137 @@
 
 # Archivo: binance_account.py
-from binance.client import Client
 from binance.exceptions import BinanceAPIException
-from decimal import Decimal, ROUND_DOWN
-from config import API_KEY, API_SECRET, TRADING_ENABLED, SYMBOLS, MIN_TRADE_DIFF
+from client_factory import get_client
+from config import (TRADING_ENABLED, SYMBOLS, MIN_TRADE_DIFF, ACCOUNT_CACHE_TTL,
+                    FILTERS_CACHE_FILE, FILTERS_REFRESH_HOURS, PRICE_CACHE_TTL)
+from symbol_filters import SymbolFilters
+from price_book import PriceBook
+import threading
+import time
+
+class AccountSnapshot:
+    """Foto única de balances con TTL corto, parcheada con cada fill"""
+    def __init__(self, client, ttl=ACCOUNT_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.balances = {}  # asset -> {'free': float, 'locked': float}
+        self.updated_at = 0.0
+        self.update_time = 0  # updateTime (ms, servidor) de la última respuesta de get_account cargada
+        self.fill_time = 0  # transactTime (ms) del último fill parcheado a mano
+        self.stream_backed = False  # True mientras el user data stream mantiene los balances
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Balances actuales (una sola llamada a get_account por TTL)"""
+        with self._lock:
+            if self.updated_at and (self.stream_backed or time.time() - self.updated_at < self.ttl):
+                return dict(self.balances)
+        # ✅ RED FUERA DEL LOCK: una recarga de la GUI en cola del scheduler no bloquea al bot
+        # (las recargas simultáneas se agrupan en una sola llamada en el CoalescingClient)
+        account = self.client.get_account()
+        with self._lock:
+            self._load(account)
+            return dict(self.balances)
+    
+    def _load(self, account):
+        update_time = int(account.get('updateTime', 0))
+        if update_time and update_time < self.fill_time:
+            return  # ✅ RESPUESTA ANTERIOR A UN FILL YA PARCHEADO: los balances locales son más nuevos
+        self.update_time = update_time
+        self.balances = {
+            b['asset']: {'free': float(b['free']), 'locked': float(b['locked'])}
+            for b in account['balances']
+        }
+        self.updated_at = time.time()
+    
+    def set_account(self, account):
+        """Carga una respuesta de get_account obtenida fuera (p. ej. por el AsyncClient)"""
+        with self._lock:
+            self._load(account)
+    
+    def invalidate(self):
+        with self._lock:
+            self.updated_at = 0.0
+    
+    def update_balances(self, balances, update_time=0):
+        """✅ VALORES ABSOLUTOS DESDE outboundAccountPosition (u = hora de la última actualización)"""
+        with self._lock:
+            self.balances.update(balances)
+            self.update_time = max(self.update_time, int(update_time))
+    
+    def apply_delta(self, asset, delta):
+        """✅ DEPÓSITOS/RETIROS DESDE balanceUpdate"""
+        with self._lock:
+            entry = self.balances.get(asset, {'free': 0.0, 'locked': 0.0})
+            self.balances[asset] = {'free': entry['free'] + delta, 'locked': entry['locked']}
+    
+    def apply_fill(self, symbol, side, order):
+        """✅ PARCHEAR BALANCES CON LA RESPUESTA DE UNA ORDEN (sin esperar al TTL)"""
+        if self.stream_backed:
+            return  # El stream aplica el fill desde el executionReport
+        try:
+            commissions = [(f['commissionAsset'], float(f['commission'])) for f in order.get('fills', [])]
+            self._apply_trade(symbol, side, float(order['executedQty']), float(order['cummulativeQuoteQty']),
+                              commissions, int(order.get('transactTime', 0)))
+        except (KeyError, TypeError, ValueError):
+            # ✅ RESPUESTA INCOMPLETA - FORZAR RECARGA
+            self.invalidate()
+    
+    def apply_execution(self, report):
+        """✅ FILL DESDE executionReport DEL USER DATA STREAM (l/Y = cantidad/importe de este fill)"""
+        if report.get('x') != 'TRADE':
+            return
+        try:
+            commissions = [(report['N'], float(report['n']))] if report.get('N') else []
+            self._apply_trade(report['s'], report['S'], float(report['l']), float(report['Y']),
+                              commissions, int(report.get('T', 0)))
+        except (KeyError, TypeError, ValueError):
+            self.invalidate()
+    
+    def _apply_trade(self, symbol, side, base_qty, quote_qty, commissions, transact_time):
+        asset, quote = symbol[:-len('USDC')], 'USDC'
+        sign = 1 if side == 'BUY' else -1
+        with self._lock:
+            if not self.updated_at:
+                return
+            if transact_time and self.update_time >= transact_time:
+                return  # ✅ LA FOTO SE TOMÓ DESPUÉS DEL FILL Y YA LO INCLUYE
+            self.fill_time = max(self.fill_time, transact_time)
+            deltas = [(asset, sign * base_qty), (quote, -sign * quote_qty)]
+            deltas += [(name, -amount) for name, amount in commissions]
+            for name, delta in deltas:
+                entry = self.balances.get(name, {'free': 0.0, 'locked': 0.0})
+                self.balances[name] = {'free': max(0.0, entry['free'] + delta), 'locked': entry['locked']}
 
 class BinanceAccount:
     def __init__(self, gui=None):
         self.gui = gui
-        self.client = Client(API_KEY, API_SECRET)
+        self.client = get_client()
+        self.snapshot = AccountSnapshot(self.client)
+        self.price_book = PriceBook(self.client, SYMBOLS, PRICE_CACHE_TTL)
+        
+        # ✅ FILTROS DE EXCHANGE CARGADOS UNA VEZ (fuera del camino crítico de las órdenes)
+        self.filters = SymbolFilters(self.client, SYMBOLS, FILTERS_CACHE_FILE, FILTERS_REFRESH_HOURS)
+        try:
+            self.filters.load()
+        except Exception as e:
+            print(f"⚠️ Error cargando filtros de exchange: {e}")
+    
+    def get_balances(self):
+        """Balances por asset desde la foto compartida"""
+        return self.snapshot.get()
     
     def get_balance_usdc(self):
         """Balance total en USDC (incluyendo conversión de otros assets)"""
         try:
-            account = self.client.get_account()
-            total = 0.0
-            prices = {t['symbol']: float(t['price']) for t in self.client.get_all_tickers()}
-            for b in account['balances']:
-                asset = b['asset']
-                free = float(b['free'])
-                if asset == 'USDC':
-                    total += free
-                elif f"{asset}USDC" in prices:
-                    total += free * prices[f"{asset}USDC"]
+            balances = self.get_balances()
+            total = balances.get('USDC', {}).get('free', 0.0)
+            
+            # ✅ SOLO LOS PARES NECESARIOS, EN UN LOTE (no todos los tickers del exchange)
+            symbols = self.valuation_symbols(balances)
+            prices = self.price_book.get_prices(symbols)
+            for symbol in symbols:
+                total += balances[symbol[:-len('USDC')]]['free'] * prices.get(symbol, 0.0)
             return total
         except Exception as e:
             print(f"Error getting balance: {e}")
@@ -30,41 +139,69 @@ class BinanceAccount:
     
     def get_symbol_balance(self, symbol):
         asset = symbol.replace('USDC', '')
-        account = self.client.get_account()
-        for b in account['balances']:
-            if b['asset'] == asset:
-                return float(b['free']) + float(b['locked'])
+        b = self.get_balances().get(asset)
+        if b:
+            return b['free'] + b['locked']
         return 0.0
     
+    def valuation_symbols(self, balances):
+        """Pares <ASSET>USDC existentes para los assets con saldo"""
+        known = self.known_usdc_symbols()
+        return [f"{asset}USDC" for asset, b in balances.items()
+                if asset != 'USDC' and (b['free'] > 0 or b['locked'] > 0) and f"{asset}USDC" in known]
+    
+    def known_usdc_symbols(self):
+        """Pares válidos: los del exchangeInfo o, si no se pudieron cargar, los configurados"""
+        return self.filters.usdc_symbols or set(SYMBOLS)
+    
     def get_current_price(self, symbol):
+        # ✅ UN PAR INEXISTENTE HARÍA FALLAR TODO EL LOTE
+        if symbol not in self.known_usdc_symbols():
+            return 0.0
         try:
-            return float(self.client.get_symbol_ticker(symbol=symbol)['price'])
+            return self.price_book.price(symbol)
         except:
             return 0.0
     
     def format_quantity(self, symbol, quantity):
-        """Formatea quantity para Binance rules"""
-        info = self.client.get_symbol_info(symbol)
-        lot_filter = next((f for f in info['filters'] if f['filterType'] == 'LOT_SIZE'), None)
-        if lot_filter:
-            min_qty = float(lot_filter['minQty'])
-            step_size = float(lot_filter['stepSize'])
-            quantity_dec = Decimal(str(quantity))
-            step_dec = Decimal(str(step_size))
-            steps = (quantity_dec / step_dec).to_integral_value(rounding=ROUND_DOWN)
-            formatted = float(steps * step_dec)
-            return max(min_qty, formatted)
-        return quantity
+        """Formatea quantity para Binance rules (stepSize con aritmética entera)"""
+        return self.filters.round_quantity(symbol, quantity)
+    
+    def format_quote(self, usd_amount):
+        """Importe en USDC para quoteOrderQty (truncado a 8 decimales)"""
+        return self.filters.round_quote(usd_amount)
+    
+    def check_quote_filters(self, symbol, quote_amount, side):
+        """✅ RECHAZO LOCAL DE ÓRDENES POR IMPORTE (minNotional)"""
+        ok, reason = self.filters.validate_quote(symbol, quote_amount)
+        if ok:
+            return True, ""
+        msg = f"❌ ORDEN RECHAZADA {side} {symbol}: {reason}"
+        if self.gui:
+            self.gui.log_trade(msg, 'RED')
+        return False, msg
+    
+    def check_filters(self, symbol, quantity, price, side):
+        """✅ RECHAZO LOCAL DE ÓRDENES QUE NO PASARÍAN LOS FILTROS"""
+        ok, reason = self.filters.validate(symbol, quantity, price)
+        if ok:
+            return True, ""
+        msg = f"❌ ORDEN RECHAZADA {side} {symbol}: {reason}"
+        if self.gui:
+            self.gui.log_trade(msg, 'RED')
+        return False, msg
 
     # Archivo: binance_account.py - MODIFICAR MÉTODO buy_market
-    def buy_market(self, symbol, usd_amount):
+    def buy_market(self, symbol, usd_amount, decided_at=None):
+        """decided_at: time.perf_counter() de la decisión del plan (por defecto, ahora)"""
+        decided_at = time.perf_counter() if decided_at is None else decided_at
         if not TRADING_ENABLED:
             msg = f"[SIM] 🟢 BUY {symbol}: ${usd_amount:.1f}"
             if self.gui: 
                 self.gui.log_trade(msg, 'GREEN')
-            return True, msg
+            return True, msg, usd_amount
         try:
-            # ✅ OBTENER BALANCE DISPONIBLE EN USDC
+            # ✅ BALANCE DISPONIBLE EN USDC (foto en memoria, sin round trip)
             available_usdc = self.get_available_usdc()
             
             # ✅ SI NO HAY SUFICIENTE CAPITAL, USAR TODO EL DISPONIBLE
@@ -74,73 +211,76 @@ class BinanceAccount:
                     msg = f"❌ CAPITAL INSUFICIENTE {symbol}: Necesita ${usd_amount:.2f}, disponible ${available_usdc:.2f}"
                     if self.gui: 
                         self.gui.log_trade(msg, 'RED')
-                    return False, msg
+                    return False, msg, 0.0
                 
                 msg = f"⚠️ CAPITAL LIMITADO {symbol}: Usando ${usd_amount:.2f} de ${available_usdc:.2f} disponible"
                 if self.gui: 
                     self.gui.log_trade(msg, 'YELLOW')
             
-            price = self.get_current_price(symbol)
-            quantity = self.format_quantity(symbol, usd_amount / price)
-            
-            # ✅ VERIFICAR QUE LA CANTIDAD SEA VÁLIDA
-            if quantity <= 0:
-                msg = f"❌ CANTIDAD INVÁLIDA {symbol}: {quantity}"
-                if self.gui: 
-                    self.gui.log_trade(msg, 'RED')
-                return False, msg
+            # ✅ COMPRA POR IMPORTE EN USDC (quoteOrderQty): SIN PRECIO NI stepSize, UNA SOLA PETICIÓN
+            quote_amount = self.format_quote(usd_amount)
+            ok, msg = self.check_quote_filters(symbol, quote_amount, 'BUY')
+            if not ok:
+                return False, msg, 0.0
                 
-            order = self.client.order_market_buy(symbol=symbol, quantity=quantity)
+            order = self.client.order_market_buy(symbol=symbol, quoteOrderQty=quote_amount)
+            latency_ms = (time.perf_counter() - decided_at) * 1000
+            self.snapshot.apply_fill(symbol, 'BUY', order)
             
             # Log detallado
-            executed_price = float(order['fills'][0]['price']) if order.get('fills') else price
-            executed_total = float(order['cummulativeQuoteQty']) if order.get('cummulativeQuoteQty') else usd_amount
+            quantity = float(order.get('executedQty', 0))
+            executed_total = float(order['cummulativeQuoteQty']) if order.get('cummulativeQuoteQty') else quote_amount
+            executed_price = float(order['fills'][0]['price']) if order.get('fills') else (executed_total / quantity if quantity else 0.0)
             
-            msg = f"🟢 BUY {symbol}: {quantity:.2f} a ${executed_price:.4f} = ${executed_total:.4f}"
+            msg = f"🟢 BUY {symbol}: {quantity:.2f} a ${executed_price:.4f} = ${executed_total:.4f} [{latency_ms:.0f} ms]"
             if self.gui: 
                 self.gui.log_trade(msg, 'GREEN')
-            return True, msg
+            return True, msg, executed_total
             
         except BinanceAPIException as e:
             msg = f"❌ ERROR BUY {symbol}: {e.message}"
             if self.gui: 
                 self.gui.log_trade(msg, 'RED')
-            return False, msg
+            return False, msg, 0.0
 
 
     def get_available_usdc(self):
         """Obtiene el balance disponible en USDC"""
         try:
-            account = self.client.get_account()
-            for balance in account['balances']:
-                if balance['asset'] == 'USDC':
-                    return float(balance['free'])
-            return 0.0
+            b = self.get_balances().get('USDC')
+            return b['free'] if b else 0.0
         except Exception as e:
             print(f"Error getting USDC balance: {e}")
             return 0.0
 
-    def sell_market(self, symbol, quantity):
+    def sell_market(self, symbol, quantity, decided_at=None):
+        decided_at = time.perf_counter() if decided_at is None else decided_at
         if not TRADING_ENABLED:
             msg = f"[SIM] 🔴 SELL {symbol}: {quantity:.1f}"
             if self.gui: 
                 self.gui.log_trade(msg, 'RED')
-            return True, msg
+            return True, msg, quantity * self.price_book.peek(symbol)
         try:
-            price = self.get_current_price(symbol)
+            # ✅ PRECIO DE REFERENCIA EN EL tickSize (estimación conservadora del notional)
+            price = self.filters.round_price(symbol, self.get_current_price(symbol))
             quantity = self.format_quantity(symbol, quantity)
+            ok, msg = self.check_filters(symbol, quantity, price, 'SELL')
+            if not ok:
+                return False, msg, 0.0
             order = self.client.order_market_sell(symbol=symbol, quantity=quantity)
+            latency_ms = (time.perf_counter() - decided_at) * 1000
+            self.snapshot.apply_fill(symbol, 'SELL', order)
             
             # Log detallado
             executed_price = float(order['fills'][0]['price']) if order.get('fills') else price
             executed_total = float(order['cummulativeQuoteQty']) if order.get('cummulativeQuoteQty') else quantity * price
             
-            msg = f"SELL {symbol}:{quantity:.2f} at ${executed_price:.4f}= ${executed_total:.4f}"
+            msg = f"SELL {symbol}:{quantity:.2f} at ${executed_price:.4f}= ${executed_total:.4f} [{latency_ms:.0f} ms]"
             if self.gui: 
                 self.gui.log_trade(msg, 'RED')
-            return True, msg
+            return True, msg, executed_total
         except BinanceAPIException as e:
             msg = f"❌ ERROR VENTA {symbol}: {e.message}"
             if self.gui: 
                 self.gui.log_trade(msg, 'RED')
-            return False, msg
\ No newline at end of file
+            return False, msg, 0.0
\ No newline at end of file
@@ -1,5 +1,11 @@
 # Archivo: capital_manager.py - VERSIÓN CON RESET SIMPLE
-from config import TIMEFRAMES, SYMBOLS, TIMEFRAME_WEIGHTS, MIN_TRADE_DIFF
+from config import (TIMEFRAMES, SYMBOLS, TIMEFRAME_WEIGHTS, MIN_TRADE_DIFF, FETCH_WORKERS, ORDER_WORKERS,
+                    STATE_FILE, STATE_MAX_AGE_HOURS)
+from concurrent.futures import ThreadPoolExecutor
+from rebalance_planner import plan_rebalance
+from cooldown_scheduler import CooldownScheduler
+from strategy_state import StrategyState, COLOR_NAMES, NO_COLOR, DIRECTION_CODES, DIRECTION_NAMES
+import numpy as np
 from datetime import datetime
 import time
 
@@ -10,33 +16,114 @@ class CapitalManager:
         self.gui = gui
         self.base_allocation = 1.0 / len(SYMBOLS)
         self.last_weights = {s: 0.0 for s in SYMBOLS}
-        self.last_signals = {s: {tf: None for tf in TIMEFRAMES} for s in SYMBOLS}
-        self.last_directions = {s: {tf: None for tf in TIMEFRAMES} for s in SYMBOLS}
+        
+        # ✅ ESTADO EN MATRICES (símbolo × timeframe): colores, direcciones, cooldowns y pesos bloqueados
+        self.state = StrategyState(SYMBOLS, TIMEFRAMES, TIMEFRAME_WEIGHTS)
         
         # ✅ SISTEMA DE COOLDOWN
-        self.cooldowns = {s: {tf: 0 for tf in TIMEFRAMES} for s in SYMBOLS}
-        self.locked_weights = {s: {tf: None for tf in TIMEFRAMES} for s in SYMBOLS}
+        self.cooldown_timers = CooldownScheduler()  # Heap de vencimientos (state.deadlines es la vista)
         
         self.SYMBOLS = SYMBOLS
         self.first_rebalance_done = False
+        
+        # ✅ POOL ACOTADO PARA LA FASE DE DESCARGA (respeta rate limits)
+        self.fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="Fetch")
+        self.order_executor = ThreadPoolExecutor(max_workers=ORDER_WORKERS, thread_name_prefix="Order")
+    
+    def save_state(self):
+        """✅ CHECKPOINT DEL ESTADO DE LA ESTRATEGIA (tras cada ciclo)"""
+        try:
+            self.state.save(STATE_FILE, self.last_weights, self.first_rebalance_done)
+        except Exception as e:
+            print(f"⚠️ Error guardando {STATE_FILE}: {e}")
+    
+    def load_state(self):
+        """✅ ARRANQUE EN CALIENTE: restaura señales, direcciones, cooldowns y pesos"""
+        try:
+            restored = self.state.load(STATE_FILE, STATE_MAX_AGE_HOURS * 3600)
+        except Exception as e:
+            print(f"⚠️ Error leyendo {STATE_FILE}: {e}")
+            return False
+        if restored is None:
+            return False
+        last_weights, self.first_rebalance_done = restored
+        self.last_weights.update(last_weights)
+        
+        # ✅ COOLDOWNS CONTRA EL RELOJ: LOS VENCIDOS SE LIBERAN EN EL PRIMER update_cooldowns
+        for i, j in zip(*self.state.deadlines.nonzero()):
+            self.cooldown_timers.schedule(self.state.symbols[i], self.state.timeframes[j], self.state.deadlines[i, j])
+        
+        msg = f"♻️ Estado restaurado ({len(last_weights)} símbolos, {len(self.cooldown_timers)} cooldowns)"
+        print(msg)
+        if self.gui:
+            self.gui.log_trade(msg, 'BLUE')
+        return True
     
     def get_signals(self, symbol):
         """✅ OBTENER SEÑALES REALES (sin bloqueo)"""
         signals = {}
         
+        # ✅ UNA SOLA DESCARGA POR SÍMBOLO + MOTOR OO INCREMENTAL
+        results = self.indicators.get_signals(symbol, list(TIMEFRAMES.values()))
+        for tf_name, tf in TIMEFRAMES.items():
+            color, _ = results.get(tf, ("RED", 0.0))
+            signals[tf_name] = color
+        
+        return signals
+    
+    def signals_from_ohlc(self, symbol, ohlc):
+        """✅ SEÑALES A PARTIR DE DATOS YA DESCARGADOS (sin I/O)"""
+        signals = {}
         for tf_name, tf in TIMEFRAMES.items():
             try:
-                df = self.indicators.get_klines(symbol, tf)
-                if not df.empty:
-                    color, _ = self.indicators.calculate_oo(df)
-                    signals[tf_name] = color
-                else:
-                    signals[tf_name] = "RED"
-            except Exception as e:
+                color, _ = self.indicators.oo_engine.update(symbol, tf, ohlc[tf])
+                signals[tf_name] = color
+            except Exception:
                 signals[tf_name] = "RED"
-        
         return signals
     
+    def changed_symbols(self, symbols):
+        """✅ SÍMBOLOS CUYO COLOR OO CAMBIÓ CON LAS VELAS YA EN MEMORIA (sin I/O, todos en una pasada)"""
+        timeframes = list(TIMEFRAMES.values())
+        series = {}
+        for symbol in symbols:
+            if symbol not in self.state.symbol_index:
+                continue
+            try:
+                series[symbol] = self.indicators.get_ohlc(symbol, timeframes, cached=True)
+            except Exception as e:
+                print(f"Error reading klines for {symbol}: {e}")
+        if not series:
+            return set()
+        
+        # ✅ UN SOLO oo_batch (símbolos × timeframes) COMPARADO CONTRA LA MATRIZ DE COLORES
+        codes, _ = self.indicators.calculate_oo_codes(series, timeframes)
+        rows = [self.state.symbol_index[symbol] for symbol in series]
+        differs = (codes != self.state.colors[rows]).any(axis=1)
+        return {symbol for symbol, changed in zip(series, differs) if changed}
+    
+    def fetch_symbol_data(self, symbol):
+        """✅ FASE DE DESCARGA DE UN SÍMBOLO: klines, balance y precio"""
+        return {
+            'ohlc': self.indicators.get_ohlc(symbol, list(TIMEFRAMES.values())),
+            'balance': self.account.get_symbol_balance(symbol),
+            'price': self.account.get_current_price(symbol)
+        }
+    
+    def fetch_market_data(self, symbols):
+        """✅ DESCARGA CONCURRENTE DE TODOS LOS SÍMBOLOS (≈ 1 round trip por ciclo)"""
+        total_future = self.fetch_executor.submit(self.account.get_balance_usdc)
+        futures = {symbol: self.fetch_executor.submit(self.fetch_symbol_data, symbol) for symbol in symbols}
+        
+        market_data = {}
+        for symbol, future in futures.items():
+            try:
+                market_data[symbol] = future.result()
+            except Exception as e:
+                print(f"Error fetching {symbol}: {e}")
+                market_data[symbol] = None
+        return total_future.result(), market_data
+    
     def get_signal_value(self, color):
         return {"RED": 0, "YELLOW": 1, "GREEN": 2}.get(color, 0)
     
@@ -54,28 +141,36 @@ class CapitalManager:
         return {"30m": 15, "1h": 30, "2h": 60}.get(tf, 15)
     
     def update_cooldowns(self):
-        current_time = time.time()
-        
-        for symbol in self.SYMBOLS:
-            for tf in TIMEFRAMES:
-                if (self.cooldowns[symbol][tf] > 0 and 
-                    current_time >= self.cooldowns[symbol][tf]):
-                    # ✅ COOLDOWN TERMINADO
-                    self.cooldowns[symbol][tf] = 0
-                    self.locked_weights[symbol][tf] = None
-                    
-                    msg = f"⏰ COOLDOWN ENDED {symbol} {tf}"
-                    if self.gui:
-                        self.gui.log_trade(msg, 'BLUE')
+        """Libera los cooldowns vencidos (solo los que salen del heap); devuelve los símbolos afectados"""
+        ended = set()
+        
+        for symbol, tf in self.cooldown_timers.pop_expired(time.time()):
+            # ✅ COOLDOWN TERMINADO
+            i, j = self.state.symbol_index[symbol], self.state.tf_index[tf]
+            self.state.deadlines[i, j] = 0
+            self.state.locked[i, j] = np.nan
+            ended.add(symbol)
+            
+            msg = f"⏰ COOLDOWN ENDED {symbol} {tf}"
+            if self.gui:
+                self.gui.log_trade(msg, 'BLUE')
+        
+        return ended
+    
+    def next_cooldown_deadline(self):
+        """Instante (time.time) del próximo fin de cooldown, o None"""
+        return self.cooldown_timers.next_deadline()
     
     def start_cooldown(self, symbol, tf, current_signal):
         """✅ INICIAR COOLDOWN - BLOQUEAR PESO ACTUAL"""
         cooldown_minutes = self.timeframe_to_minutes(tf)
-        self.cooldowns[symbol][tf] = time.time() + (cooldown_minutes * 60)
+        i, j = self.state.symbol_index[symbol], self.state.tf_index[tf]
+        self.state.deadlines[i, j] = time.time() + (cooldown_minutes * 60)
+        self.cooldown_timers.schedule(symbol, tf, self.state.deadlines[i, j])
         
         # ✅ CALCULAR Y BLOQUEAR PESO ACTUAL
         weight_for_tf = self.calculate_weight_for_timeframe(current_signal, tf)
-        self.locked_weights[symbol][tf] = weight_for_tf
+        self.state.locked[i, j] = weight_for_tf
         
         msg = f"⏰ COOLDOWN STARTED {symbol} {tf} - {cooldown_minutes} min - Peso bloqueado: {weight_for_tf:.2f}"
         if self.gui:
@@ -84,10 +179,12 @@ class CapitalManager:
     def reset_cooldown(self, symbol, tf):
         """✅ RESET COOLDOWN - SOLO REINICIAR TEMPORIZADOR"""
         cooldown_minutes = self.timeframe_to_minutes(tf)
-        self.cooldowns[symbol][tf] = time.time() + (cooldown_minutes * 60)
+        i, j = self.state.symbol_index[symbol], self.state.tf_index[tf]
+        self.state.deadlines[i, j] = time.time() + (cooldown_minutes * 60)
+        self.cooldown_timers.schedule(symbol, tf, self.state.deadlines[i, j])
         
         # ✅ MANTENER EL MISMO PESO BLOQUEADO (no cambiar)
-        current_locked_weight = self.locked_weights[symbol][tf]
+        current_locked_weight = self.state.locked[i, j]
         
         msg = f"🔄 COOLDOWN RESET {symbol} {tf} - {cooldown_minutes} min más - Peso mantiene: {current_locked_weight:.2f}"
         if self.gui:
@@ -102,32 +199,33 @@ class CapitalManager:
             return w * 0.5
         return 0.0
     
-    def calculate_weight(self, signals):
-        """✅ CALCULAR PESO TOTAL CON BLOQUEOS"""
-        weight = 0.0
-        
-        for tf, color in signals.items():
-            symbol = list(self.SYMBOLS)[0]  # Se ajusta en rebalance
-            
-            if (self.cooldowns.get(symbol, {}).get(tf, 0) > time.time() and
-                self.locked_weights.get(symbol, {}).get(tf) is not None):
-                # ✅ USAR PESO BLOQUEADO
-                weight += self.locked_weights[symbol][tf]
-            else:
-                # ✅ USAR PESO NORMAL
-                weight += self.calculate_weight_for_timeframe(color, tf)
-        
-        return weight
+    def calculate_weight(self, signals, symbol=None):
+        """✅ CALCULAR PESO TOTAL CON LOS BLOQUEOS DEL PROPIO SÍMBOLO"""
+        row = self.state.symbol_index.get(symbol)
+        if row is None:
+            # ✅ SÍMBOLO SIN ESTADO: PESO NORMAL SIN BLOQUEOS
+            return sum(self.calculate_weight_for_timeframe(color, tf) for tf, color in signals.items())
+        return float(self.calculate_weights([symbol], [signals])[0])
+    
+    def calculate_weights(self, symbols, signals_list, now=None):
+        """✅ PESOS DE VARIOS SÍMBOLOS EN UN SOLO PRODUCTO ESCALAR ENMASCARADO"""
+        rows = [self.state.symbol_index[symbol] for symbol in symbols]
+        codes = [self.state.encode(signals) for signals in signals_list]
+        return self.state.weights(rows, codes, time.time() if now is None else now)
     
     def process_signal_changes(self, symbol, new_signals):
         """✅ PROCESAR CAMBIOS CON RESET DE COOLDOWN"""
         if not self.first_rebalance_done:
             return
             
-        old_signals = self.last_signals.get(symbol, {})
+        state = self.state
+        i = state.symbol_index[symbol]
+        now = time.time()
         
         for tf, new_color in new_signals.items():
-            old_color = old_signals.get(tf)
+            j = state.tf_index[tf]
+            old_code = state.colors[i, j]
+            old_color = COLOR_NAMES[old_code] if old_code != NO_COLOR else None
             
             if old_color is not None and new_color != old_color:
                 # ✅ LOG DEL CAMBIO DE SEÑAL
@@ -137,7 +235,7 @@ class CapitalManager:
                 
                 # ✅ VERIFICAR CAMBIO DE DIRECCIÓN
                 current_direction = self.get_direction(old_color, new_color)
-                last_direction = self.last_directions[symbol].get(tf)
+                last_direction = DIRECTION_NAMES[state.directions[i, j]]
                 
                 if (last_direction is not None and 
                     current_direction != "NEUTRAL" and 
@@ -149,91 +247,149 @@ class CapitalManager:
                         self.gui.log_trade(direction_msg, 'YELLOW')
                     
                     # ✅ VERIFICAR SI HAY COOLDOWN ACTIVO
-                    if self.cooldowns[symbol][tf] > time.time():
+                    if state.deadlines[i, j] > now:
                         # ✅ COOLDOWN ACTIVO - SOLO RESETEAR TEMPORIZADOR
                         self.reset_cooldown(symbol, tf)
                     else:
                         # ✅ NO HAY COOLDOWN - INICIAR NUEVO
                         self.start_cooldown(symbol, tf, new_color)
                 
-                self.last_directions[symbol][tf] = current_direction
+                state.directions[i, j] = DIRECTION_CODES[current_direction]
         
-        self.last_signals[symbol] = new_signals
+        state.colors[i] = state.encode(new_signals)
 
-    def rebalance(self, manual=False):
-        self.update_cooldowns()
+    def rebalance(self, manual=False, dry_run=False, symbols=None):
+        """Ciclo completo (o solo `symbols`); con dry_run=True devuelve el RebalancePlan sin operar"""
+        if not dry_run:
+            self.update_cooldowns()
         
-        total_usd = self.account.get_balance_usdc()
+        # ✅ FASE 1: DESCARGA CONCURRENTE (solo los símbolos afectados si se indican)
+        total_usd, market_data = self.fetch_market_data(symbols or SYMBOLS)
         if total_usd <= 0:
             return "No capital"
         
         actions = []
-        force_initial_rebalance = not self.first_rebalance_done
         
+        # ✅ FASE 2: PLAN VECTORIZADO CON LOS DATOS YA DESCARGADOS
+        plan = self.build_plan(market_data, total_usd, self.account.get_available_usdc(), manual, actions, dry_run)
+        if dry_run:
+            return plan
+        
+        # ✅ FASE 3: EJECUCIÓN (ventas primero, luego compras con el USDC liberado)
+        self.execute_plan(plan)
+        
+        return self.finish_rebalance(actions)
+    
+    def build_plan(self, market_data, total_usd, cash, manual=False, actions=None, dry_run=False):
+        """✅ SEÑALES POR SÍMBOLO; PESOS, OBJETIVOS Y DIFERENCIAS DE TODOS A LA VEZ"""
+        force_initial_rebalance = not self.first_rebalance_done
+        symbols, signals_list, prices, balances = [], [], [], []
         for symbol in SYMBOLS:
+            data = market_data.get(symbol)
+            if data is None:
+                continue
             # ✅ OBTENER SEÑALES REALES
-            signals = self.get_signals(symbol)
+            signals = self.signals_from_ohlc(symbol, data['ohlc'])
             
             # ✅ PROCESAR CAMBIOS (puede activar/resetear cooldowns)
-            self.process_signal_changes(symbol, signals)
-            
-            # ✅ CALCULAR PESO (con bloqueos aplicados)
-            weight = self.calculate_weight(signals)
-            
-            # ✅ LOG DE BLOQUEOS ACTIVOS
-            active_cooldowns = []
-            for tf in TIMEFRAMES:
-                if self.cooldowns[symbol][tf] > time.time():
-                    locked_weight = self.locked_weights[symbol][tf]
-                    remaining = int((self.cooldowns[symbol][tf] - time.time()) / 60)
-                    active_cooldowns.append(f"{tf}({locked_weight:.2f})[{remaining}m]")
-            
-            if active_cooldowns:
-                lock_msg = f"🔒 {symbol} Cooldowns: {', '.join(active_cooldowns)}"
-                if self.gui:
-                    self.gui.log_trade(lock_msg, 'BLUE')
-            
-            old_weight = self.last_weights.get(symbol, 0.0)
-            signal_changed = abs(weight - old_weight) > 0.001
+            if not dry_run:
+                self.process_signal_changes(symbol, signals)
+            symbols.append(symbol)
+            signals_list.append(signals)
+            prices.append(data['price'])
+            balances.append(data['balance'])
+        
+        # ✅ CALCULAR PESOS (con los bloqueos de cada símbolo)
+        now = time.time()
+        weights = self.calculate_weights(symbols, signals_list, now) if symbols else np.zeros(0)
+        active = [self.review_weight(symbol, float(weight), manual, force_initial_rebalance, actions, dry_run, now)
+                  for symbol, weight in zip(symbols, weights)]
+        plan = plan_rebalance(symbols, weights, prices, balances, active, total_usd, cash,
+                              self.base_allocation, MIN_TRADE_DIFF)
+        plan.decided_at = time.perf_counter()
+        return plan
+    
+    def review_weight(self, symbol, weight, manual, force_initial_rebalance, actions=None, dry_run=False, now=None):
+        """✅ COMPARA CON EL PESO ANTERIOR Y REGISTRA: devuelve si el símbolo debe operar este ciclo"""
+        old_weight = self.last_weights.get(symbol, 0.0)
+        signal_changed = abs(weight - old_weight) > 0.001
+        is_active = force_initial_rebalance or signal_changed or manual
+        if dry_run:
+            return is_active
+        self.last_weights[symbol] = weight
+        
+        # ✅ LOG DE BLOQUEOS ACTIVOS
+        now = time.time() if now is None else now
+        i = self.state.symbol_index[symbol]
+        active_cooldowns = []
+        for j in self.state.active_cooldowns(i, now):
+            locked_weight = self.state.locked[i, j]
+            remaining = int((self.state.deadlines[i, j] - now) / 60)
+            active_cooldowns.append(f"{self.state.timeframes[j]}({locked_weight:.2f})[{remaining}m]")
+        
+        if active_cooldowns:
+            lock_msg = f"🔒 {symbol} Cooldowns: {', '.join(active_cooldowns)}"
+            if self.gui:
+                self.gui.log_trade(lock_msg, 'BLUE')
+        
+        if (signal_changed and not manual) or force_initial_rebalance:
+            change_detail = f" [Cooldowns: {', '.join(active_cooldowns)}]" if active_cooldowns else ""
             
-            if force_initial_rebalance or signal_changed or manual:
-                if (signal_changed and not manual) or force_initial_rebalance:
-                    change_detail = f" [Cooldowns: {', '.join(active_cooldowns)}]" if active_cooldowns else ""
-                    
-                    if force_initial_rebalance:
-                        signal_change_msg = f"🎯 INITIAL REBALANCE {symbol}: Weight {weight:.2f}{change_detail}"
-                    else:
-                        direction = "📈" if weight > old_weight else "📉"
-                        signal_change_msg = f"{symbol}: {direction} {old_weight:.2f} → {weight:.2f}{change_detail}"
-                    
-                    actions.append(signal_change_msg)
-                    if self.gui:
-                        self.gui.log_trade(signal_change_msg)
-                
-                # ✅ LÓGICA DE TRADING NORMAL...
-                target_usd = total_usd * self.base_allocation * min(1.0, weight)
-                current_balance = self.account.get_symbol_balance(symbol)
-                price = self.account.get_current_price(symbol)
-                current_usd = current_balance * price
-                diff_usd = target_usd - current_usd
-                
-                if abs(diff_usd) > MIN_TRADE_DIFF:
-                    if diff_usd > 0:
-                        available_usdc = self.account.get_available_usdc()
-                        if available_usdc < diff_usd:
-                            diff_usd = available_usdc
-                        if diff_usd > MIN_TRADE_DIFF:
-                            success, msg = self.account.buy_market(symbol, diff_usd)
-                            if success and self.gui:
-                                self.gui.force_token_update(symbol)
-                    else:
-                        quantity = abs(diff_usd) / price
-                        success, msg = self.account.sell_market(symbol, quantity)
-                        if success and self.gui:
-                            self.gui.force_token_update(symbol)
+            if force_initial_rebalance:
+                signal_change_msg = f"🎯 INITIAL REBALANCE {symbol}: Weight {weight:.2f}{change_detail}"
+            else:
+                direction = "📈" if weight > old_weight else "📉"
+                signal_change_msg = f"{symbol}: {direction} {old_weight:.2f} → {weight:.2f}{change_detail}"
             
-            self.last_weights[symbol] = weight
+            if actions is not None:
+                actions.append(signal_change_msg)
+            if self.gui:
+                self.gui.log_trade(signal_change_msg)
+        
+        return is_active
+    
+    def execute_plan(self, plan):
+        """✅ EJECUTOR EN DOS FASES: todas las ventas a la vez, después todas las compras a la vez"""
+        # ✅ CAJA LOCAL: USDC LIBRE + LO QUE LIBERAN LAS VENTAS (sin volver a consultar la cuenta)
+        cash = plan.cash
         
+        decided_at = plan.decided_at or time.perf_counter()
+        futures = [self.order_executor.submit(self.execute_trade, symbol, usd, price, decided_at)
+                   for symbol, usd, price in plan.sells()]
+        for future in futures:
+            # ✅ SOLO SE ACREDITA LO QUE REALMENTE SE VENDIÓ (cummulativeQuoteQty), NO LO PLANEADO
+            cash += self._trade_result(future)
+        
+        # ✅ EL PLAN YA REPARTE EL USDC; SI ALGUNA VENTA FALLA SE RECORTA AQUÍ
+        futures = []
+        for symbol, usd, price in plan.buys():
+            usd_amount = min(usd, cash)
+            if usd_amount <= MIN_TRADE_DIFF:
+                continue
+            cash -= usd_amount
+            futures.append(self.order_executor.submit(self.execute_trade, symbol, usd_amount, price, decided_at))
+        for future in futures:
+            self._trade_result(future)
+    
+    def _trade_result(self, future):
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error executing trade: {e}")
+            return 0.0
+    
+    def execute_trade(self, symbol, diff_usd, price, decided_at=None):
+        """✅ UNA ORDEN DEL PLAN: devuelve el importe ejecutado en USDC (0.0 si falla)"""
+        if diff_usd > 0:
+            success, msg, executed = self.account.buy_market(symbol, diff_usd, decided_at)
+        else:
+            quantity = abs(diff_usd) / price
+            success, msg, executed = self.account.sell_market(symbol, quantity, decided_at)
+        if success and self.gui:
+            self.gui.force_token_update(symbol)
+        return executed if success else 0.0
+    
+    def finish_rebalance(self, actions):
         if not self.first_rebalance_done:
             self.first_rebalance_done = True
             completion_msg = "✅ Initial Rebalance Completed"
@@ -241,4 +397,5 @@ class CapitalManager:
             if self.gui:
                 self.gui.log_trade(completion_msg, 'GREEN')
         
-        return actions if actions else "No ajustes necesarios"
\ No newline at end of file
+        self.save_state()
+        return actions if actions else "No ajustes necesarios"
@@ -0,0 +1,51 @@
+# Archivo: client_factory.py
+import threading
+from requests.adapters import HTTPAdapter
+from binance.client import Client
+from config import (API_KEY, API_SECRET, HTTP_POOL_SIZE, HTTP_TIMEOUT, RATE_LIMIT_WEIGHT_PER_MIN,
+                    RATE_LIMIT_ORDERS_PER_10S, RATE_LIMIT_ORDERS_PER_DAY, GUI_SHED_RATIO,
+                    METRICS_FILE, METRICS_DUMP_SECONDS)
+from api_metrics import ApiMetrics, InstrumentedClient
+from request_scheduler import RequestScheduler, ScheduledClient
+from single_flight import CoalescingClient
+
+_client = None
+_lock = threading.Lock()
+
+# ✅ SCHEDULER ÚNICO: TODO EL PROCESO COMPARTE LOS LÍMITES DE LA IP/CUENTA
+scheduler = RequestScheduler(RATE_LIMIT_WEIGHT_PER_MIN, RATE_LIMIT_ORDERS_PER_10S,
+                             RATE_LIMIT_ORDERS_PER_DAY, GUI_SHED_RATIO)
+
+# ✅ MÉTRICAS ÚNICAS DE LATENCIA/ERRORES POR ENDPOINT (cliente síncrono y AsyncClient)
+metrics = ApiMetrics(METRICS_FILE, METRICS_DUMP_SECONDS)
+
+def create_client():
+    """Cliente Binance con pool keep-alive dimensionado para los workers y timeouts configurables"""
+    client = Client(API_KEY, API_SECRET, requests_params={'timeout': HTTP_TIMEOUT})
+    
+    # ✅ UNA CONEXIÓN TLS REUTILIZABLE POR WORKER (sin handshakes repetidos)
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_SIZE, pool_block=True)
+    client.session.mount('https://', adapter)
+    client.session.hooks['response'].append(scheduler.on_response)
+    
+    # ✅ LLAMADAS IDÉNTICAS SIMULTÁNEAS SE AGRUPAN ANTES DE PASAR POR EL SCHEDULER
+    # (las métricas envuelven solo la petición real, sin la espera del scheduler)
+    return CoalescingClient(ScheduledClient(InstrumentedClient(client, metrics), scheduler))
+
+def get_client():
+    """Cliente único del proceso, compartido por bot, cuenta y GUI (thread-safe)"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = create_client()
+        return _client
+
+def close_client():
+    """Cierra la sesión compartida (la siguiente llamada a get_client crea otra)"""
+    global _client
+    with _lock:
+        if _client is not None:
+            try:
+                _client.close_connection()
+            finally:
+                _client = None
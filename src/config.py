@@ -12,10 +12,43 @@ API_SECRET = os.getenv('BINANCE_API_SECRET')
 if not API_KEY or not API_SECRET:
     raise ValueError("❌ No se encontraron las API keys en las variables de entorno")
 
+# ✅ PARÁMETROS DE LA ESTRATEGIA (definidos sin dependencias en strategy_config.py)
+from strategy_config import SYMBOLS, TIMEFRAMES, TIMEFRAME_WEIGHTS, MIN_TRADE_DIFF
+
 TRADING_ENABLED = True
-SYMBOLS = ["BNBUSDC", "FETUSDC", "SOLUSDC", "LINKUSDC", "XLMUSDC"]
-TIMEFRAMES = {"30m": "30m", "1h": "1h", "2h": "2h"}
-TIMEFRAME_WEIGHTS = {"30m": 0.30, "1h": 0.30, "2h": 0.40}
 UPDATE_INTERVAL = 30
-MIN_TRADE_DIFF = 15
-DEFAULT_CHART_TIMEFRAME = "1D"
\ No newline at end of file
+DEFAULT_CHART_TIMEFRAME = "1D"
+FETCH_WORKERS = 4  # Descargas concurrentes por ciclo de rebalanceo
+ORDER_WORKERS = 5  # Órdenes simultáneas en cada fase (ventas / compras)
+HTTP_POOL_SIZE = FETCH_WORKERS + ORDER_WORKERS + 4  # Workers de descarga y órdenes + hilos de GUI y streams
+HTTP_TIMEOUT = (3.05, 10)  # (connect, read) en segundos
+
+# ✅ RATE LIMITS DE BINANCE (se sincronizan con las cabeceras X-MBX-*)
+RATE_LIMIT_WEIGHT_PER_MIN = 6000
+RATE_LIMIT_ORDERS_PER_10S = 50
+RATE_LIMIT_ORDERS_PER_DAY = 160000
+GUI_SHED_RATIO = 0.7  # Por encima de este uso se descartan las peticiones de la GUI
+ACCOUNT_CACHE_TTL = 5  # Segundos de validez de la foto de balances
+FILTERS_CACHE_FILE = "exchange_filters.json"
+FILTERS_REFRESH_HOURS = 6
+PRICE_CACHE_TTL = 2  # Segundos de validez del lote de precios (sin stream)
+STATE_FILE = "bot_state.npz"  # Checkpoint de señales, cooldowns y pesos (arranque en caliente)
+STATE_MAX_AGE_HOURS = 12  # Checkpoints más antiguos se ignoran
+METRICS_FILE = "api_metrics.json"  # Histogramas de latencia/errores por endpoint
+METRICS_DUMP_SECONDS = 300
+
+# ✅ STREAMING DE MERCADO (WebSocket en vez de polling REST)
+STREAMING_ENABLED = False
+STREAM_URL = "wss://stream.binance.com:9443"
+
+# ✅ USER DATA STREAM (balances en memoria en vez de polling get_account)
+USER_STREAM_ENABLED = False
+USER_STREAM_URL = "wss://stream.binance.com:9443"
+
+# ✅ MOTOR DEL BOT: "thread" (bucle con hilos) o "asyncio" (una tarea por símbolo en un event loop)
+ENGINE = "thread"
+
+# ✅ REBALANCEO POR EVENTOS (requiere STREAMING_ENABLED): solo al cambiar un color, acabar un cooldown o a mano
+EVENT_DRIVEN = False
+EVENT_DEBOUNCE_SECONDS = 1.0  # Agrupa los ticks de varias velas en una evaluación
+EVENT_HEARTBEAT_SECONDS = 300  # Rebalanceo completo de seguridad (0 = desactivado)
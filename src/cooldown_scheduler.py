@@ -0,0 +1,44 @@
+# Archivo: cooldown_scheduler.py
+import heapq
+import itertools
+
+
+class CooldownScheduler:
+    """Min-heap de vencimientos de cooldown: inicio/reset O(log n), vencidos sin recorrer todo"""
+
+    def __init__(self):
+        self.deadlines = {}  # (symbol, tf) -> vencimiento vigente
+        self._heap = []  # (vencimiento, orden, symbol, tf); las entradas obsoletas se descartan al salir
+        self._counter = itertools.count()
+
+    def schedule(self, symbol, tf, deadline):
+        """Inicia o reinicia el cooldown (la entrada anterior queda obsoleta en el heap)"""
+        self.deadlines[(symbol, tf)] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), symbol, tf))
+        # ✅ COMPACTAR SI LOS RESETS DEJAN DEMASIADAS ENTRADAS MUERTAS
+        if len(self._heap) > 2 * len(self.deadlines) + 64:
+            self._heap = [(d, next(self._counter), s, t) for (s, t), d in self.deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def _is_current(self, entry):
+        deadline, _, symbol, tf = entry
+        return self.deadlines.get((symbol, tf)) == deadline
+
+    def pop_expired(self, now):
+        """(symbol, tf) de los cooldowns vencidos en `now`, en orden de vencimiento"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                del self.deadlines[(entry[2], entry[3])]
+                expired.append((entry[2], entry[3]))
+        return expired
+
+    def next_deadline(self):
+        """Próximo vencimiento vigente (None si no hay cooldowns)"""
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self.deadlines)
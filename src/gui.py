@@ -16,6 +16,7 @@ import subprocess
 from config import DEFAULT_CHART_TIMEFRAME
 import time
 from concurrent.futures import ThreadPoolExecutor
+from request_scheduler import request_priority, PRIORITY_GUI
 import random 
 
 # Configuración de colores
@@ -486,19 +487,16 @@ class ModernTradingGUI:
             if timeframe not in tf_map:
                 return 0.0
                 
-            # Obtener klines para el timeframe
-            klines = self.bot.client.get_klines(
-                symbol=symbol, 
-                interval=tf_map[timeframe],
-                limit=2  # Solo necesitamos 2 velas: actual y anterior
-            )
-            
-            if len(klines) < 2:
+            # ✅ USAR VENTANA EN MEMORIA DEL BOT (solo descarga si aún no existe)
+            ohlc = self.bot.indicators.get_ohlc(symbol, [tf_map[timeframe]], cached=True)
+            closes = ohlc[tf_map[timeframe]]['close']
+            
+            if len(closes) < 2:
                 return 0.0
                 
             # Precio de cierre actual y anterior
-            current_close = float(klines[-1][4])  # Última vela, precio de cierre
-            previous_close = float(klines[-2][4]) # Vela anterior, precio de cierre
+            current_close = float(closes[-1])  # Última vela, precio de cierre
+            previous_close = float(closes[-2]) # Vela anterior, precio de cierre
             
             # Calcular % de cambio
             if previous_close == 0:
@@ -1437,8 +1435,21 @@ class ModernTradingGUI:
     def calculate_all_tokens_daily_change(self):
         """✅ CAMBIOS DIARIOS - LOGS REDUCIDOS"""
         try:
-            # ✅ LOG INICIAL REDUCIDO
-            all_tickers = self.bot.client.get_ticker()
+            # ✅ USAR miniTicker DEL STREAM SI ESTÁ CONECTADO
+            stream = getattr(self.bot, 'stream', None)
+            if stream and stream.connected:
+                daily_changes = {}
+                for symbol in self.token_frames.keys():
+                    change = stream.get_daily_change(symbol) or 0.0
+                    sign = "+" if change >= 0 else ""
+                    daily_changes[symbol] = f"{sign}{change:.2f}%"
+                return daily_changes
+            
+            # ✅ /ticker/24hr SOLO DE LOS TOKENS MOSTRADOS (peso 2 por símbolo, no 80 por el mercado entero)
+            symbols = sorted(self.token_frames.keys())
+            if not symbols:
+                return {}
+            all_tickers = self.bot.client.get_ticker(symbols=json.dumps(symbols, separators=(',', ':')))
             
             daily_changes = {}
             symbols_found = 0
@@ -1697,7 +1708,9 @@ class ModernTradingGUI:
         """Programa una tarea en background de forma segura"""
         def background_wrapper():
             try:
-                task_function()
+                # ✅ LA GUI VA DETRÁS DE ÓRDENES Y REBALANCEO EN EL RATE LIMIT
+                with request_priority(PRIORITY_GUI):
+                    task_function()
             except Exception as e:
                 print(f"Error en tarea background: {e}")
                 
@@ -1750,16 +1763,16 @@ class ModernTradingGUI:
             
             # ✅ PROCESAR TOKENS (LOG REDUCIDO)
             all_symbols = list(self.token_frames.keys())
+            total_balance = self.bot.account.get_balance_usdc()
             
             for symbol in all_symbols:
                 try:
                     # ✅ SOLO LOG ESENCIAL POR TOKEN
                     signals = self.bot.manager.get_signals(symbol)
-                    weight = self.bot.manager.calculate_weight(signals)
+                    weight = self.bot.manager.calculate_weight(signals, symbol)
                     price = self.bot.account.get_current_price(symbol)
                     balance = self.bot.account.get_symbol_balance(symbol)
                     usd_value = balance * price
-                    total_balance = self.bot.account.get_balance_usdc()
                     pct = (usd_value / total_balance * 100) if total_balance > 0 else 0
                     
                     daily_change = daily_changes.get(symbol, "+0.00%")
@@ -2199,17 +2212,18 @@ class ModernTradingGUI:
                     return
                     
                 # Obtener datos frescos del token
-                signals = self.bot.manager.get_signals(symbol)
-                weight = self.bot.manager.calculate_weight(signals)
-                price = self.bot.account.get_current_price(symbol)
-                balance = self.bot.account.get_symbol_balance(symbol)
-                usd_value = balance * price
-                total_balance = self.bot.account.get_balance_usdc()
-                pct = (usd_value / total_balance * 100) if total_balance > 0 else 0
-                
-                # Obtener cambio diario
-                daily_changes = self.calculate_all_tokens_daily_change()
-                daily_change = daily_changes.get(symbol, "+0.00%")
+                with request_priority(PRIORITY_GUI):
+                    signals = self.bot.manager.get_signals(symbol)
+                    weight = self.bot.manager.calculate_weight(signals, symbol)
+                    price = self.bot.account.get_current_price(symbol)
+                    balance = self.bot.account.get_symbol_balance(symbol)
+                    usd_value = balance * price
+                    total_balance = self.bot.account.get_balance_usdc()
+                    pct = (usd_value / total_balance * 100) if total_balance > 0 else 0
+                    
+                    # Obtener cambio diario
+                    daily_changes = self.calculate_all_tokens_daily_change()
+                    daily_change = daily_changes.get(symbol, "+0.00%")
                 
                 # Actualizar UI
                 symbol_data = {
@@ -2259,14 +2273,11 @@ class ModernTradingGUI:
     def get_portfolio_data(self, total_balance):
         """Obtiene datos completos de la cartera"""
         try:
-            account_info = self.bot.client.get_account()
+            balances = self.bot.account.get_balances()
             assets = []
             
-            for balance in account_info['balances']:
-                asset = balance['asset']
-                free = float(balance['free'])
-                locked = float(balance['locked'])
-                total = free + locked
+            for asset, balance in balances.items():
+                total = balance['free'] + balance['locked']
                 
                 if total > 0:
                     # Calcular valor en USD
@@ -2591,7 +2602,7 @@ class ModernTradingGUI:
             for symbol in self.token_frames.keys():
                 try:
                     signals = self.bot.manager.get_signals(symbol)
-                    weight = self.bot.manager.calculate_weight(signals)
+                    weight = self.bot.manager.calculate_weight(signals, symbol)
                     price = self.bot.account.get_current_price(symbol)
                     balance = self.bot.account.get_symbol_balance(symbol)
                     usd_value = balance * price
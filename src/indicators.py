@@ -1,61 +1,92 @@
-
 # Archivo: indicators.py
-import pandas as pd
+import numpy as np
 from binance.client import Client
+from config import TIMEFRAMES
+from kline_store import KlineStore
+from oo_engine import OOEngine, classify_oo, stack_ohlc, oo_batch
+from strategy_config import INTERVAL_MINUTES
+
+def bars_to_ohlc(bars):
+    """Array KLINE_DTYPE → dict de columnas (vistas, sin copia)"""
+    return {name: bars[name] for name in ('open_time', 'open', 'high', 'low', 'close', 'volume')}
+
+def resample_ohlc(ohlc, minutes):
+    """Agrega velas a un intervalo mayor (vectorizado, buckets alineados a UTC)"""
+    period = minutes * 60_000
+    open_time = ohlc['open_time']
+    if len(open_time) == 0:
+        return ohlc
+    bucket = open_time // period
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    # ✅ DESCARTAR EL PRIMER BUCKET SI EMPIEZA A MEDIAS
+    if open_time[0] != bucket[0] * period:
+        starts = starts[1:]
+    if len(starts) == 0:
+        return {k: v[:0] for k, v in ohlc.items()}
+    first = starts[0]
+    offsets = starts - first
+    ends = np.r_[starts[1:], len(open_time)] - 1
+    return {
+        'open_time': bucket[starts] * period,
+        'open': ohlc['open'][starts],
+        'high': np.maximum.reduceat(ohlc['high'][first:], offsets),
+        'low': np.minimum.reduceat(ohlc['low'][first:], offsets),
+        'close': ohlc['close'][ends],
+        'volume': np.add.reduceat(ohlc['volume'][first:], offsets)
+    }
 
 class Indicators:
     def __init__(self, client):
         self.client = client
         self.length = 8  # Para indicador OO
+        self.window = 100  # Velas por timeframe
+        
+        # ✅ SOLO SE DESCARGA EL INTERVALO MÁS FINO, EL RESTO SE CONSTRUYE LOCALMENTE
+        self.base_timeframe = min(TIMEFRAMES.values(), key=lambda tf: INTERVAL_MINUTES.get(tf, float('inf')))
+        max_ratio = max((self._resample_ratio(tf) or 1) for tf in TIMEFRAMES.values())
+        self.store = KlineStore(client, limit=self.window * max_ratio + max_ratio)
+        self.oo_engine = OOEngine(self.length)
+    
+    def _resample_ratio(self, timeframe):
+        """Velas base por vela del timeframe (None si hay que descargarlo directo)"""
+        base = INTERVAL_MINUTES.get(self.base_timeframe)
+        minutes = INTERVAL_MINUTES.get(timeframe)
+        if not base or not minutes or minutes % base:
+            return None
+        return minutes // base
+    
+    def fetch_intervals(self):
+        """Intervalos que realmente se descargan (base + los no derivables)"""
+        return [self.base_timeframe] + [tf for tf in TIMEFRAMES.values() if self._resample_ratio(tf) is None]
     
-    def get_klines(self, symbol, timeframe):
-        """Obtiene klines recientes, incluyendo vela actual"""
+    def get_ohlc(self, symbol, timeframes, cached=False):
+        """OHLC crudo por timeframe descargando el intervalo base una sola vez"""
+        result = {}
+        base_ohlc = None
+        for tf in timeframes:
+            ratio = self._resample_ratio(tf)
+            if ratio is None:
+                bars = self.store.peek(symbol, tf) if cached else None
+                ohlc = bars_to_ohlc(bars if bars is not None else self.store.get(symbol, tf))
+            else:
+                if base_ohlc is None:
+                    base = self.base_timeframe
+                    bars = self.store.peek(symbol, base) if cached else None
+                    base_ohlc = bars_to_ohlc(bars if bars is not None else self.store.get(symbol, base))
+                ohlc = base_ohlc if ratio == 1 else resample_ohlc(base_ohlc, INTERVAL_MINUTES[tf])
+            result[tf] = {k: v[-self.window:] for k, v in ohlc.items()}
+        return result
+    
+    def get_signals(self, symbol, timeframes):
+        """(color, diff) por timeframe con el motor OO incremental"""
         try:
-            klines = self.client.get_klines(symbol=symbol, interval=timeframe, limit=100)
-            df = pd.DataFrame(klines, columns=['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'])
-            df = df.astype({'open': float, 'high': float, 'low': float, 'close': float})
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df.set_index('open_time', inplace=True)
-            return self.to_heikin_ashi(df)
+            ohlc = self.get_ohlc(symbol, timeframes)
         except Exception as e:
-            print(f"Error getting klines for {symbol} {timeframe}: {e}")
-            return pd.DataFrame()
-    
-    def to_heikin_ashi(self, df):
-        """Convierte a Heikin Ashi"""
-        ha_df = df.copy()
-        ha_df['ha_close'] = (df['open'] + df['high'] + df['low'] + df['close']) / 4
-        ha_df['ha_open'] = ((df['open'].shift(1) + df['close'].shift(1)) / 2).fillna((df['open'] + df['close']) / 2)
-        ha_df['ha_high'] = ha_df[['ha_open', 'ha_close', 'high']].max(axis=1)
-        ha_df['ha_low'] = ha_df[['ha_open', 'ha_close', 'low']].min(axis=1)
-        ha_df['open'] = ha_df['ha_open']
-        ha_df['high'] = ha_df['ha_high']
-        ha_df['low'] = ha_df['ha_low']
-        ha_df['close'] = ha_df['ha_close']
-        return ha_df[['open', 'high', 'low', 'close']]
+            print(f"Error getting klines for {symbol} {list(timeframes)}: {e}")
+            return {tf: ("RED", 0.0) for tf in timeframes}
+        return {tf: self.oo_engine.update(symbol, tf, data) for tf, data in ohlc.items()}
     
-    def calculate_oo(self, df):
-        """Indicador OO con detección yellow"""
-        if len(df) < self.length:
-            return "RED", 0.0
-        df['ys1'] = (df['high'] + df['low'] + df['close'] * 2) / 4
-        df['rk3'] = df['ys1'].ewm(span=self.length, adjust=False).mean()
-        df['rk4'] = df['ys1'].rolling(window=self.length).std().fillna(0.001)
-        df['rk5'] = (df['ys1'] - df['rk3']) * 100 / df['rk4']
-        df['rk6'] = df['rk5'].ewm(span=self.length, adjust=False).mean()
-        df['up'] = df['rk6'].ewm(span=self.length, adjust=False).mean()
-        df['down'] = df['up'].ewm(span=self.length, adjust=False).mean()
-        
-        last_up, last_down = df['up'].iloc[-1], df['down'].iloc[-1]
-        prev_up, prev_down = df['up'].iloc[-2], df['down'].iloc[-2]
-        diff = last_up - last_down
-        
-        up_changing = (prev_up > last_up) and (prev_down < last_down)
-        down_changing = (prev_up < last_up) and (prev_down > last_down)
-        is_yellow = up_changing or down_changing
-        
-        if last_up > last_down:
-            return ("YELLOW" if is_yellow else "GREEN"), diff * (0.5 if is_yellow else 1.0)
-        else:
-            return ("YELLOW" if is_yellow else "RED"), diff * (0.5 if is_yellow else 1.0)
-
+    def calculate_oo_codes(self, series, timeframes):
+        """OO vectorizado para {symbol: {tf: ohlc}} → (códigos (S, T), diffs (S, T)) en el orden de `series`"""
+        stacked = stack_ohlc([[series[s][tf] for tf in timeframes] for s in series], self.window)
+        return oo_batch(stacked, self.length)
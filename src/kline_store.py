@@ -0,0 +1,168 @@
+# Archivo: kline_store.py
+import threading
+
+import numpy as np
+
+MAX_KLINES_PER_REQUEST = 1000  # Límite de Binance por llamada
+
+# ✅ FORMATO COMPACTO DE VELA (tiempos int64 en ms, precios/volúmenes float64)
+KLINE_DTYPE = np.dtype([
+    ('open_time', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'),
+    ('volume', 'f8'), ('close_time', 'i8'), ('quote_volume', 'f8'), ('trades', 'i8'),
+    ('taker_buy_base', 'f8'), ('taker_buy_quote', 'f8')
+])
+
+
+def parse_klines(rows):
+    """Lista de klines REST/stream → array estructurado KLINE_DTYPE (sin DataFrame intermedio)"""
+    parsed = np.empty(len(rows), dtype=KLINE_DTYPE)
+    if len(rows):
+        # ✅ CONVERSIÓN POR COLUMNA EN C (string → float64 / int64)
+        columns = list(zip(*rows))
+        for i, name in enumerate(KLINE_DTYPE.names):
+            parsed[name] = np.array(columns[i], dtype=KLINE_DTYPE[name])
+    return parsed
+
+
+class KlineStore:
+    """Ventana de klines en memoria por (symbol, interval) con descarga incremental"""
+
+    def __init__(self, client, limit=100):
+        self.client = client
+        self.limit = limit
+        self._windows = {}
+        self._live = set()  # Claves alimentadas por WebSocket (sin REST)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _get_key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, symbol, interval):
+        """Devuelve la ventana actualizada pidiendo solo las velas nuevas"""
+        key = (symbol, interval)
+        key_lock = self._get_key_lock(key)
+        with key_lock:
+            window = self._windows.get(key)
+            if window is not None and len(window) and key in self._live:
+                return window
+        # ✅ RED FUERA DEL LOCK: una descarga de la GUI en cola del scheduler no bloquea al bot
+        # (las descargas idénticas simultáneas se agrupan en el CoalescingClient)
+        if window is None or not len(window):
+            fetched = self._fetch_latest(symbol, interval)
+        else:
+            # ✅ PEDIR DESDE LA ÚLTIMA VELA GUARDADA (la vela en formación se reemplaza)
+            request_limit = min(self.limit, MAX_KLINES_PER_REQUEST)
+            new_rows = self.client.get_klines(symbol=symbol, interval=interval,
+                                              startTime=int(window['open_time'][-1]), limit=request_limit)
+            if len(new_rows) >= request_limit:
+                # ✅ HUECO MAYOR QUE LA VENTANA - DESCARGA COMPLETA
+                fetched = self._fetch_latest(symbol, interval)
+            else:
+                fetched = self.merge(window, parse_klines(new_rows))
+        with key_lock:
+            # ✅ SI OTRO HILO O EL STREAM DEJÓ UNA VENTANA MÁS RECIENTE MIENTRAS TANTO, SE CONSERVA
+            current = self._windows.get(key)
+            if (current is None or not len(current) or not len(fetched)
+                    or current['open_time'][-1] <= fetched['open_time'][-1]):
+                self._windows[key] = fetched
+            return self._windows[key]
+
+    def _fetch_latest(self, symbol, interval):
+        """Descarga las últimas `limit` velas, paginando hacia atrás si hace falta"""
+        rows = []
+        end_time = None
+        while len(rows) < self.limit:
+            params = {'symbol': symbol, 'interval': interval,
+                      'limit': min(self.limit - len(rows), MAX_KLINES_PER_REQUEST)}
+            if end_time is not None:
+                params['endTime'] = end_time
+            page = self.client.get_klines(**params)
+            rows = list(page) + rows
+            if len(page) < params['limit']:
+                break
+            end_time = page[0][0] - 1
+        return parse_klines(rows)
+
+    async def aget(self, symbol, interval, aclient):
+        """Versión asyncio de get() con un AsyncClient (una tarea por símbolo, sin locks de hilo)"""
+        key = (symbol, interval)
+        window = self._windows.get(key)
+        if window is not None and len(window) and key in self._live:
+            return window
+        if window is None or not len(window):
+            window = await self._afetch_latest(symbol, interval, aclient)
+        else:
+            request_limit = min(self.limit, MAX_KLINES_PER_REQUEST)
+            new_rows = await aclient.get_klines(symbol=symbol, interval=interval,
+                                                startTime=int(window['open_time'][-1]), limit=request_limit)
+            if len(new_rows) >= request_limit:
+                window = await self._afetch_latest(symbol, interval, aclient)
+            else:
+                window = self.merge(window, parse_klines(new_rows))
+        self._windows[key] = window
+        return window
+
+    async def _afetch_latest(self, symbol, interval, aclient):
+        rows = []
+        end_time = None
+        while len(rows) < self.limit:
+            params = {'symbol': symbol, 'interval': interval,
+                      'limit': min(self.limit - len(rows), MAX_KLINES_PER_REQUEST)}
+            if end_time is not None:
+                params['endTime'] = end_time
+            page = await aclient.get_klines(**params)
+            rows = list(page) + rows
+            if len(page) < params['limit']:
+                break
+            end_time = page[0][0] - 1
+        return parse_klines(rows)
+
+    def apply(self, symbol, interval, row):
+        """Aplica una vela recibida por stream. Devuelve False si hay un hueco"""
+        key = (symbol, interval)
+        with self._get_key_lock(key):
+            window = self._windows.get(key)
+            if window is None or not len(window):
+                return False
+            bar = parse_klines([row])
+            last_open, last_close = window['open_time'][-1], window['close_time'][-1]
+            open_time = bar['open_time'][0]
+            if open_time < last_open:
+                return True  # Vela antigua, se ignora
+            if open_time > last_open and open_time != last_close + 1:
+                return False  # Faltan velas entre medio
+            self._windows[key] = self.merge(window, bar)
+            return True
+
+    def set_live(self, symbol, interval, live):
+        """Marca una clave como alimentada por stream (get() no llama a REST)"""
+        with self._lock:
+            if live:
+                self._live.add((symbol, interval))
+            else:
+                self._live.discard((symbol, interval))
+
+    def peek(self, symbol, interval):
+        """Ventana guardada sin llamar a la API (None si aún no existe)"""
+        window = self._windows.get((symbol, interval))
+        return window if window is not None and len(window) else None
+
+    def merge(self, window, new_bars):
+        """Reemplaza velas con el mismo open_time y añade las nuevas (arrays nuevos, nunca in-place)"""
+        if not len(new_bars):
+            return window
+        keep = np.searchsorted(window['open_time'], new_bars['open_time'][0])
+        return np.concatenate([window[:keep], new_bars])[-self.limit:]
+
+    def clear(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._windows.clear()
+            else:
+                for key in [k for k in self._windows if k[0] == symbol]:
+                    del self._windows[key]
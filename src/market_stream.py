@@ -0,0 +1,203 @@
+# Archivo: market_stream.py
+import json
+import threading
+import time
+
+try:
+    import websocket  # websocket-client
+except ImportError:
+    websocket = None
+
+
+class ReconnectingWebSocket:
+    """Conexión WebSocket en un hilo con reconexión automática (backoff exponencial)"""
+
+    name = "WebSocket"
+
+    def __init__(self):
+        self.connected = False
+        self.running = False
+        self.reconnects = 0
+        self.ws = None
+        self.thread = None
+
+    def stream_url(self):
+        raise NotImplementedError
+
+    def on_connected(self):
+        """Se llama en cada (re)conexión"""
+
+    def on_disconnected(self):
+        """Se llama al perder la conexión"""
+
+    def handle(self, data):
+        """Procesa un mensaje JSON ya decodificado"""
+
+    def start(self):
+        if websocket is None:
+            print(f"⚠️ websocket-client no instalado - {self.name} desactivado")
+            return False
+        if self.running:
+            return True
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=3.0)
+        self.on_disconnected()
+
+    def _run(self):
+        backoff = 1
+        while self.running:
+            started = time.time()
+            try:
+                self.ws = websocket.WebSocketApp(
+                    self.stream_url(),
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close
+                )
+                self.ws.run_forever(ping_interval=60, ping_timeout=10)
+            except Exception as e:
+                print(f"⚠️ {self.name} error: {e}")
+            self.connected = False
+            self.on_disconnected()
+            if not self.running:
+                break
+            # ✅ SI LA CONEXIÓN DURÓ, REINICIAR EL BACKOFF
+            if time.time() - started > 60:
+                backoff = 1
+            self.reconnects += 1
+            print(f"🔌 {self.name} desconectado, reintentando en {backoff}s...")
+            for _ in range(backoff * 10):
+                if not self.running:
+                    return
+                time.sleep(0.1)
+            backoff = min(backoff * 2, 60)
+
+    def _on_open(self, ws):
+        self.connected = True
+        print(f"🔌 {self.name} conectado")
+        self.on_connected()
+
+    def _on_close(self, ws, status_code=None, msg=None):
+        self.connected = False
+
+    def _on_error(self, ws, error):
+        print(f"⚠️ {self.name} error: {error}")
+
+    def _on_message(self, ws, message):
+        try:
+            payload = json.loads(message)
+            self.handle(payload.get('data', payload) if 'stream' in payload else payload)
+        except Exception as e:
+            print(f"⚠️ {self.name} mensaje inválido: {e}")
+
+
+class MarketStream(ReconnectingWebSocket):
+    """Streams combinados kline + miniTicker que alimentan el KlineStore y los precios"""
+
+    name = "MarketStream"
+
+    def __init__(self, store, symbols, intervals, url="wss://stream.binance.com:9443"):
+        super().__init__()
+        self.store = store
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self.url = url.rstrip('/')
+        self.prices = {}  # symbol -> último precio
+        self.tickers = {}  # symbol -> miniTicker (open/close 24h)
+        self.on_kline = None  # callback(symbol, interval, row, closed)
+        self._resync_lock = threading.Lock()
+        self._pending_resync = set()
+
+    def stream_url(self):
+        streams = []
+        for symbol in self.symbols:
+            s = symbol.lower()
+            streams += [f"{s}@kline_{interval}" for interval in self.intervals]
+            streams.append(f"{s}@miniTicker")
+        return f"{self.url}/stream?streams={'/'.join(streams)}"
+
+    def on_connected(self):
+        # ✅ RESINCRONIZAR POR REST LO PERDIDO MIENTRAS NO HABÍA CONEXIÓN
+        threading.Thread(target=self.resync, daemon=True).start()
+
+    def on_disconnected(self):
+        self._set_live(False)
+
+    def _set_live(self, live, keys=None):
+        for symbol, interval in keys or [(s, i) for s in self.symbols for i in self.intervals]:
+            self.store.set_live(symbol, interval, live)
+
+    def resync(self, keys=None):
+        """Rellena huecos por REST y vuelve a marcar las claves como alimentadas por stream"""
+        keys = keys or [(s, i) for s in self.symbols for i in self.intervals]
+        with self._resync_lock:
+            for symbol, interval in keys:
+                if not self.running:
+                    return
+                try:
+                    self.store.set_live(symbol, interval, False)
+                    self.store.get(symbol, interval)
+                    if self.connected:
+                        self.store.set_live(symbol, interval, True)
+                except Exception as e:
+                    print(f"⚠️ Error resincronizando {symbol} {interval}: {e}")
+
+    def _resync_gap(self, key):
+        try:
+            self.resync([key])
+        finally:
+            self._pending_resync.discard(key)
+
+    def handle(self, data):
+        event = data.get('e')
+        if event == 'kline':
+            self._handle_kline(data)
+        elif event == '24hrMiniTicker':
+            self._handle_ticker(data)
+
+    def _handle_kline(self, data):
+        k = data['k']
+        symbol, interval = data['s'], k['i']
+        # ✅ MISMO FORMATO QUE LA RESPUESTA REST DE get_klines
+        row = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'],
+               k['q'], k['n'], k['V'], k['Q'], '0']
+        self.prices[symbol] = float(k['c'])
+        if not self.store.apply(symbol, interval, row):
+            key = (symbol, interval)
+            if key not in self._pending_resync:
+                self._pending_resync.add(key)
+                threading.Thread(target=self._resync_gap, args=(key,), daemon=True).start()
+            return
+        if self.on_kline:
+            self.on_kline(symbol, interval, row, k['x'])
+
+    def _handle_ticker(self, data):
+        symbol = data['s']
+        self.prices[symbol] = float(data['c'])
+        self.tickers[symbol] = {'open': float(data['o']), 'close': float(data['c']), 'time': data['E']}
+
+    def get_price(self, symbol):
+        """Último precio recibido (None si no hay conexión o no llegó aún)"""
+        if not self.connected:
+            return None
+        return self.prices.get(symbol)
+
+    def get_daily_change(self, symbol):
+        """% de cambio 24h calculado del miniTicker (None si no disponible)"""
+        ticker = self.tickers.get(symbol) if self.connected else None
+        if not ticker or ticker['open'] == 0:
+            return None
+        return (ticker['close'] - ticker['open']) / ticker['open'] * 100
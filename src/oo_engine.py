@@ -0,0 +1,216 @@
+# Archivo: oo_engine.py
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+
+def classify_oo(prev_up, prev_down, last_up, last_down):
+    """Color OO (RED/YELLOW/GREEN) y diff a partir de las dos últimas velas"""
+    diff = last_up - last_down
+
+    up_changing = (prev_up > last_up) and (prev_down < last_down)
+    down_changing = (prev_up < last_up) and (prev_down > last_down)
+    is_yellow = up_changing or down_changing
+
+    if last_up > last_down:
+        return ("YELLOW" if is_yellow else "GREEN"), diff * (0.5 if is_yellow else 1.0)
+    else:
+        return ("YELLOW" if is_yellow else "RED"), diff * (0.5 if is_yellow else 1.0)
+
+
+class IncrementalOO:
+    """Estado OO de una serie: EMAs + ventana de varianza, actualización O(1) por vela"""
+
+    def __init__(self, length=8):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.closed_count = 0
+        self.prev_raw = None  # (open, close) crudos de la última vela cerrada
+        self.ema = None  # (rk3, rk6, up, down) tras la última vela cerrada
+        self.window = deque(maxlen=self.length - 1)  # ys1 de las últimas velas cerradas
+        self.live_time = None
+        self.live = None  # (ys1, rk3, rk6, up, down) de la vela en formación
+        self.live_raw = None
+
+    def _step(self, o, h, l, c):
+        """Calcula los valores de una vela sobre el estado cerrado (sin modificarlo)"""
+        # ✅ HEIKIN ASHI (open a partir de la vela cruda anterior, igual que heikin_ashi_batch)
+        ha_close = (o + h + l + c) / 4
+        ha_open = (self.prev_raw[0] + self.prev_raw[1]) / 2 if self.prev_raw else (o + c) / 2
+        ha_high = max(ha_open, ha_close, h)
+        ha_low = min(ha_open, ha_close, l)
+        ys1 = (ha_high + ha_low + ha_close * 2) / 4
+
+        # ✅ DESVIACIÓN MUESTRAL DE LA VENTANA (fillna(0.001) mientras no esté completa)
+        if len(self.window) == self.length - 1:
+            values = list(self.window) + [ys1]
+            mean = sum(values) / self.length
+            rk4 = math.sqrt(sum((v - mean) ** 2 for v in values) / (self.length - 1))
+        else:
+            rk4 = 0.001
+
+        a = self.alpha
+        if self.ema is None:
+            rk3 = ys1
+            rk5 = (ys1 - rk3) * 100 / rk4
+            return ys1, rk3, rk5, rk5, rk5
+        p_rk3, p_rk6, p_up, p_down = self.ema
+        rk3 = a * ys1 + (1 - a) * p_rk3
+        rk5 = (ys1 - rk3) * 100 / rk4
+        rk6 = a * rk5 + (1 - a) * p_rk6
+        up = a * rk6 + (1 - a) * p_up
+        down = a * up + (1 - a) * p_down
+        return ys1, rk3, rk6, up, down
+
+    def _commit_live(self):
+        ys1, rk3, rk6, up, down = self.live
+        self.ema = (rk3, rk6, up, down)
+        self.window.append(ys1)
+        self.prev_raw = (self.live_raw[0], self.live_raw[3])
+        self.closed_count += 1
+
+    def update(self, open_time, o, h, l, c):
+        """Nueva vela (open_time mayor) cierra la anterior; mismo open_time = tick de la vela viva"""
+        if self.live_time is not None and open_time < self.live_time:
+            return
+        if self.live_time is not None and open_time > self.live_time:
+            self._commit_live()
+        self.live_time = open_time
+        self.live_raw = (o, h, l, c)
+        self.live = self._step(o, h, l, c)
+
+    def result(self):
+        """(color, diff) igual que oo_batch sobre la misma ventana"""
+        count = self.closed_count + (1 if self.live else 0)
+        if count < self.length or self.ema is None:
+            return "RED", 0.0
+        prev_up, prev_down = self.ema[2], self.ema[3]
+        last_up, last_down = self.live[3], self.live[4]
+        return classify_oo(prev_up, prev_down, last_up, last_down)
+
+
+class OOEngine:
+    """Estados IncrementalOO por (symbol, timeframe)"""
+
+    def __init__(self, length=8):
+        self.length = length
+        self.states = {}
+        self._lock = threading.Lock()
+
+    def get_state(self, symbol, timeframe):
+        with self._lock:
+            state = self.states.get((symbol, timeframe))
+            if state is None:
+                state = self.states[(symbol, timeframe)] = IncrementalOO(self.length)
+            return state
+
+    def update(self, symbol, timeframe, ohlc):
+        """Alimenta solo las velas desde la vela viva guardada (1-2 en régimen normal)"""
+        state = self.get_state(symbol, timeframe)
+        open_time = ohlc['open_time']
+        if len(open_time) == 0:
+            return "RED", 0.0
+        with state.lock:
+            if state.live_time is None or state.live_time < open_time[0]:
+                # ✅ SIN ESTADO O HUECO MAYOR QUE LA VENTANA - SEMBRAR CON TODA LA VENTANA
+                state.reset()
+                start = 0
+            else:
+                start = int(np.searchsorted(open_time, state.live_time))
+            o, h, l, c = ohlc['open'], ohlc['high'], ohlc['low'], ohlc['close']
+            for i in range(start, len(open_time)):
+                state.update(int(open_time[i]), float(o[i]), float(h[i]), float(l[i]), float(c[i]))
+            return state.result()
+
+
+# ✅ MOTOR VECTORIZADO: (symbols, timeframes, bars, OHLC) EN UNA SOLA PASADA
+COLOR_NAMES = np.array(["RED", "YELLOW", "GREEN"])  # Códigos 0/1/2 (= get_signal_value)
+
+
+def stack_ohlc(series, bars):
+    """Lista [symbol][timeframe] de dicts OHLC → array (S, T, bars, 4) rellenado con NaN a la izquierda"""
+    n_symbols = len(series)
+    n_timeframes = len(series[0]) if n_symbols else 0
+    stacked = np.full((n_symbols, n_timeframes, bars, 4), np.nan)
+    for i, per_tf in enumerate(series):
+        for j, ohlc in enumerate(per_tf):
+            n = min(bars, len(ohlc['close']))
+            if n:
+                for k, col in enumerate(('open', 'high', 'low', 'close')):
+                    stacked[i, j, bars - n:, k] = ohlc[col][-n:]
+    return stacked
+
+
+def heikin_ashi_batch(ohlc):
+    """Heikin Ashi vectorizado sobre el último eje de velas (open desde la vela cruda anterior)"""
+    o, h, l, c = ohlc[..., 0], ohlc[..., 1], ohlc[..., 2], ohlc[..., 3]
+    ha_close = (o + h + l + c) / 4
+    ha_open = (o + c) / 2
+    prev_open = (o[..., :-1] + c[..., :-1]) / 2
+    ha_open[..., 1:] = np.where(np.isnan(prev_open), ha_open[..., 1:], prev_open)
+    ha_high = np.fmax(np.fmax(ha_open, ha_close), h)
+    ha_low = np.fmin(np.fmin(ha_open, ha_close), l)
+    ha_high[np.isnan(ha_close)] = np.nan
+    ha_low[np.isnan(ha_close)] = np.nan
+    return np.stack([ha_open, ha_high, ha_low, ha_close], axis=-1)
+
+
+def oo_batch(ohlc, length=8):
+    """Colores (códigos 0/1/2) y diff OO para todo el array (S, T, bars, 4) de velas crudas"""
+    ha = heikin_ashi_batch(ohlc)
+    chain = oo_series((ha[..., 1] + ha[..., 2] + ha[..., 3] * 2) / 4, length)
+    up, down = chain['up'][..., -1], chain['down'][..., -1]
+    if ohlc.shape[-2] >= 2:
+        prev_up, prev_down = chain['up'][..., -2], chain['down'][..., -2]
+    else:
+        prev_up = prev_down = np.full(up.shape, np.nan)
+
+    # ✅ MISMA CLASIFICACIÓN QUE classify_oo SOBRE LAS DOS ÚLTIMAS VELAS
+    diff = up - down
+    up_changing = (prev_up > up) & (prev_down < down)
+    down_changing = (prev_up < up) & (prev_down > down)
+    is_yellow = up_changing | down_changing
+    codes = np.where(is_yellow, 1, np.where(up > down, 2, 0)).astype(np.int8)
+    diff = np.where(is_yellow, diff * 0.5, diff)
+
+    # ✅ MENOS DE `length` VELAS → RED, 0.0
+    enough = (~np.isnan(chain['ys1'])).sum(axis=-1) >= length
+    codes[~enough] = 0
+    diff = np.where(enough, diff, 0.0)
+    return codes, diff
+
+
+def oo_series(ys1, length=8):
+    """Cadena OO completa sobre velas cerradas (..., bars): ys1, rk3, rk6, up, down en cada vela
+
+    Mismas reglas que IncrementalOO: la primera vela válida siembra las EMAs y la desviación
+    vale 0.001 mientras no haya `length` velas.
+    """
+    bars = ys1.shape[-1]
+    rk4 = np.full(ys1.shape, 0.001)
+    if bars >= length:
+        windows = np.lib.stride_tricks.sliding_window_view(ys1, length, axis=-1)
+        std = windows.std(axis=-1, ddof=1)
+        rk4[..., length - 1:] = np.where(np.isnan(std), 0.001, std)
+
+    a = 2.0 / (length + 1)
+    out = {name: np.full(ys1.shape, np.nan) for name in ('rk3', 'rk6', 'up', 'down')}
+    rk3 = rk6 = up = down = np.full(ys1.shape[:-1], np.nan)
+    for i in range(bars):
+        x = ys1[..., i]
+        started = ~np.isnan(rk3)
+        rk3 = np.where(started, a * x + (1 - a) * rk3, x)
+        rk5 = (x - rk3) * 100 / rk4[..., i]
+        rk6 = np.where(started, a * rk5 + (1 - a) * rk6, rk5)
+        up = np.where(started, a * rk6 + (1 - a) * up, rk6)
+        down = np.where(started, a * up + (1 - a) * down, up)
+        out['rk3'][..., i], out['rk6'][..., i] = rk3, rk6
+        out['up'][..., i], out['down'][..., i] = up, down
+    out['ys1'] = ys1
+    return out
@@ -0,0 +1,202 @@
+# Archivo: parameter_sweep.py
+import hashlib
+import itertools
+import json
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from backtester import (MarketGrid, DEFAULT_COOLDOWN_MINUTES, DEFAULT_FEE_RATE, build_grid,
+                        compute_signal_codes, load_history, simulate)
+from strategy_config import (TIMEFRAMES, TIMEFRAME_WEIGHTS, MIN_TRADE_DIFF, SYMBOLS, SWEEP_RESULTS_FILE,
+                             INTERVAL_MINUTES)
+
+OHLC_FIELDS = ('open', 'high', 'low', 'close')
+
+
+# ✅ REJILLA DE MERCADO EN MEMORIA COMPARTIDA (una copia para todos los procesos)
+class SharedGrid:
+    """Copia la MarketGrid a un bloque SharedMemory; los workers la adjuntan sin serializarla"""
+
+    def __init__(self, grid):
+        n_symbols, n = grid.close.shape
+        self.shm = shared_memory.SharedMemory(create=True, size=(len(OHLC_FIELDS) * n_symbols + 1) * n * 8)
+        ohlc, times = _views(self.shm, n_symbols, n)
+        for k, name in enumerate(OHLC_FIELDS):
+            ohlc[k] = getattr(grid, name)
+        times[:] = grid.times
+        # ✅ LO ÚNICO QUE VIAJA A CADA WORKER (una vez, en el initializer)
+        self.spec = {'name': self.shm.name, 'symbols': list(grid.symbols),
+                     'base_interval': grid.base_interval, 'shape': (n_symbols, n)}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _views(shm, n_symbols, n):
+    ohlc = np.ndarray((len(OHLC_FIELDS), n_symbols, n), dtype=np.float64, buffer=shm.buf)
+    times = np.ndarray((n,), dtype=np.int64, buffer=shm.buf, offset=ohlc.nbytes)
+    return ohlc, times
+
+
+def attach_grid(spec):
+    """(SharedMemory, MarketGrid de solo lectura sobre el bloque compartido)"""
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    ohlc, times = _views(shm, *spec['shape'])
+    ohlc.flags.writeable = False
+    times.flags.writeable = False
+    return shm, MarketGrid.from_arrays(spec['symbols'], spec['base_interval'], times, *ohlc)
+
+
+# ✅ ESTADO DE CADA PROCESO WORKER
+_worker = {}
+
+
+def _init_worker(spec, timeframes, warmup_bars, fee_rate, initial_cash):
+    shm, grid = attach_grid(spec)
+    _worker.update(shm=shm, grid=grid, timeframes=timeframes, warmup_bars=warmup_bars,
+                   fee_rate=fee_rate, initial_cash=initial_cash, length=None, codes=None)
+
+
+def _run_combo(task):
+    """Un backtest; las señales solo dependen de `length` y se reutilizan entre combinaciones"""
+    key, params = task
+    try:
+        if _worker['length'] != params['length']:
+            _worker['codes'] = compute_signal_codes(_worker['grid'], _worker['timeframes'], params['length'])
+            _worker['length'] = params['length']
+        result = simulate(_worker['grid'], _worker['codes'], _worker['timeframes'],
+                          timeframe_weights=params['timeframe_weights'],
+                          cooldown_minutes=params['cooldown_minutes'],
+                          min_trade_diff=params['min_trade_diff'],
+                          fee_rate=_worker['fee_rate'], initial_cash=_worker['initial_cash'],
+                          warmup_bars=_worker['warmup_bars'])
+        return key, params, result.summary(), None
+    except Exception as e:
+        return key, params, None, str(e)
+
+
+# ✅ REJILLA DE PARÁMETROS
+def parameter_grid(lengths=(8,), timeframe_weights=(TIMEFRAME_WEIGHTS,), cooldown_minutes=(DEFAULT_COOLDOWN_MINUTES,),
+                   min_trade_diffs=(MIN_TRADE_DIFF,)):
+    """Producto cartesiano ordenado por `length` (las señales se calculan una vez por worker y length)"""
+    return [{'length': int(length), 'timeframe_weights': dict(weights), 'cooldown_minutes': dict(cooldowns),
+             'min_trade_diff': float(min_trade)}
+            for length, weights, cooldowns, min_trade
+            in itertools.product(lengths, timeframe_weights, cooldown_minutes, min_trade_diffs)]
+
+
+def combo_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def run_fingerprint(grid, timeframes, warmup_bars, fee_rate, initial_cash):
+    """Huella del histórico y de los ajustes fijos del barrido: solo se reanudan registros con la misma"""
+    digest = hashlib.sha1()
+    digest.update(json.dumps({'symbols': list(grid.symbols), 'base_interval': grid.base_interval,
+                              'timeframes': list(timeframes), 'warmup_bars': int(warmup_bars),
+                              'fee_rate': float(fee_rate), 'initial_cash': float(initial_cash)},
+                             sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(grid.times).tobytes())
+    for name in OHLC_FIELDS:
+        digest.update(np.ascontiguousarray(getattr(grid, name)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def load_results(path, run=None):
+    """{clave: registro} ya calculados con la huella `run`; una línea JSON por combinación (ignora una última
+    línea cortada). Los registros de otros históricos o ajustes se quedan en el archivo pero no cuentan."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, 'rb+') as f:
+        # ✅ CERRAR UNA LÍNEA CORTADA POR UNA INTERRUPCIÓN PARA QUE NO SE PEGUE AL SIGUIENTE REGISTRO
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('run') == run:
+                results[combo_key(record['params'])] = record
+    return results
+
+
+def rank_results(records, rank_by='total_return', top=None):
+    """Registros de mayor a menor según una métrica de BacktestResult.summary()"""
+    ranked = sorted((r for r in records if rank_by in r), key=lambda r: r[rank_by], reverse=True)
+    return ranked[:top] if top else ranked
+
+
+def run_sweep(history, combos, results_file=SWEEP_RESULTS_FILE, workers=None, timeframes=None, warmup_bars=None,
+              fee_rate=DEFAULT_FEE_RATE, initial_cash=1000.0, rank_by='total_return'):
+    """Reparte las combinaciones pendientes en un pool de procesos; el progreso se guarda línea a línea"""
+    grid, timeframes, default_warmup = build_grid(history, timeframes)
+    if warmup_bars is None:
+        warmup_bars = default_warmup
+    workers = workers or os.cpu_count() or 1
+
+    run = run_fingerprint(grid, timeframes, warmup_bars, fee_rate, initial_cash)
+    done = load_results(results_file, run)
+    unique = {combo_key(p): p for p in combos}  # Sin duplicados, conservando el orden por length
+    pending = [(key, params) for key, params in unique.items() if key not in done]
+    print(f"🔍 Barrido: {len(unique)} combinaciones, {len(unique) - len(pending)} ya hechas, "
+          f"{len(pending)} pendientes en {workers} procesos")
+
+    if pending:
+        shared = SharedGrid(grid)
+        started = time.perf_counter()
+        # ✅ LOTES CONTIGUOS: CADA WORKER RECIBE COMBINACIONES DEL MISMO length
+        chunksize = max(1, min(32, len(pending) // (workers * 4)))
+        try:
+            with Pool(workers, initializer=_init_worker,
+                      initargs=(shared.spec, timeframes, warmup_bars, fee_rate, initial_cash)) as pool, \
+                    open(results_file, 'a') as f:
+                for count, (key, params, summary, error) in enumerate(
+                        pool.imap_unordered(_run_combo, pending, chunksize=chunksize), 1):
+                    if error:
+                        print(f"❌ Error en {key}: {error}")
+                        continue
+                    record = {'run': run, 'params': params, **summary}
+                    f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    done[key] = record
+                    if count % 100 == 0 or count == len(pending):
+                        elapsed = time.perf_counter() - started
+                        print(f"  {count}/{len(pending)} en {elapsed:.0f}s "
+                              f"({count / elapsed:.1f}/s, faltan ~{(len(pending) - count) * elapsed / count:.0f}s)")
+        finally:
+            shared.close()
+
+    return rank_results([done[key] for key in unique if key in done], rank_by)
+
+
+if __name__ == "__main__":
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else "history"
+    base_tf = min(TIMEFRAMES.values(), key=lambda tf: INTERVAL_MINUTES.get(tf, float('inf')))
+    data = load_history(directory, SYMBOLS, base_tf)
+    if not data:
+        print(f"❌ Sin histórico en {directory}/ (<SYMBOL>_{base_tf}.npy)")
+        sys.exit(1)
+
+    # ✅ REJILLA POR DEFECTO ALREDEDOR DE LOS VALORES ACTUALES
+    tfs = list(TIMEFRAMES.values())
+    weight_options = [TIMEFRAME_WEIGHTS] + [
+        dict(zip(tfs, w)) for w in ((0.2, 0.3, 0.5), (0.4, 0.3, 0.3), (0.5, 0.3, 0.2), (1 / 3, 1 / 3, 1 / 3))]
+    cooldown_options = [{tf: int(minutes * f) for tf, minutes in DEFAULT_COOLDOWN_MINUTES.items()}
+                        for f in (0.5, 1, 2, 4)]
+    combos = parameter_grid(lengths=(5, 8, 13, 21), timeframe_weights=weight_options,
+                            cooldown_minutes=cooldown_options, min_trade_diffs=(5, 10, 15, 25, 50))
+    ranked = run_sweep(data, combos)
+    print("✅ Mejores combinaciones:")
+    for record in ranked[:10]:
+        print(f"  {record['total_return']:+.2%} dd={record['max_drawdown']:.2%} trades={record['trades']} "
+              f"fees=${record['fees']:,.2f} | {record['params']}")
@@ -0,0 +1,87 @@
+# Archivo: price_book.py
+import json
+import threading
+import time
+
+from binance.exceptions import BinanceAPIException
+
+INVALID_SYMBOL = -1121  # Un solo par inexistente hace fallar todo el lote
+
+class PriceBook:
+    """Precios de los pares <ASSET>USDC necesarios, en una sola petición por lote"""
+
+    def __init__(self, client, symbols, ttl=2):
+        self.client = client
+        self.configured = set(symbols)
+        self.tracked = set(symbols)  # Se amplía con los assets que aparezcan en la cuenta
+        self.ttl = ttl
+        self.stream = None  # MarketStream opcional (miniTicker)
+        self.prices = {}
+        self.updated_at = 0.0
+        self._lock = threading.Lock()
+
+    def track(self, symbols):
+        new = set(symbols) - self.tracked
+        if new:
+            with self._lock:
+                self.tracked |= new
+                self.updated_at = 0.0  # Forzar lote nuevo que incluya los añadidos
+
+    def refresh(self):
+        """Un solo GET /ticker/price con todos los símbolos seguidos"""
+        symbols = sorted(self.tracked)
+        if not symbols:
+            return
+        try:
+            tickers = self.client.get_symbol_ticker(symbols=self.symbols_param(symbols))
+        except BinanceAPIException as e:
+            if e.code != INVALID_SYMBOL:
+                raise
+            self.drop_unconfirmed()
+            tickers = self.client.get_symbol_ticker(symbols=self.symbols_param(sorted(self.tracked)))
+        self.load(tickers)
+
+    def drop_unconfirmed(self):
+        """Tras un -1121: deja de seguir los pares que Binance nunca ha devuelto"""
+        with self._lock:
+            dropped = self.tracked - self.configured - set(self.prices)
+            self.tracked -= dropped
+        print(f"⚠️ Par inválido en el lote de precios, se dejan de seguir: {sorted(dropped)}")
+
+    def symbols_param(self, symbols):
+        return json.dumps(symbols, separators=(',', ':'))
+
+    def load(self, tickers):
+        """Guarda un lote de /ticker/price (también el obtenido por el motor asyncio)"""
+        prices = {t['symbol']: float(t['price']) for t in tickers}
+        with self._lock:
+            self.prices = prices
+            self.updated_at = time.time()
+
+    def price(self, symbol):
+        """Precio del símbolo: stream si está conectado, si no cache con TTL (0.0 si no existe)"""
+        if self.stream:
+            price = self.stream.get_price(symbol)
+            if price:
+                return price
+        if symbol not in self.tracked:
+            self.track([symbol])
+        with self._lock:
+            stale = time.time() - self.updated_at >= self.ttl or symbol not in self.prices
+        if stale:
+            # ✅ RED FUERA DEL LOCK: un refresco de la GUI en cola del scheduler no bloquea al bot
+            self.refresh()
+        return self.prices.get(symbol, 0.0)
+
+    def peek(self, symbol):
+        """Precio ya en memoria (stream o último lote), sin red"""
+        if self.stream:
+            price = self.stream.get_price(symbol)
+            if price:
+                return price
+        return self.prices.get(symbol, 0.0)
+
+    def get_prices(self, symbols):
+        """Precios de varios símbolos con como mucho una llamada"""
+        self.track(symbols)
+        return {symbol: self.price(symbol) for symbol in symbols}
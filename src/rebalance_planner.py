@@ -0,0 +1,81 @@
+# Archivo: rebalance_planner.py
+import numpy as np
+
+
+class RebalancePlan:
+    """Resultado del planificador: arrays alineados con `symbols`, se puede ejecutar o solo inspeccionar"""
+
+    def __init__(self, symbols, weights, prices, balances, target_usd, current_usd, diff_usd,
+                 order_usd, total_usd, cash):
+        self.symbols = list(symbols)
+        self.weights = weights
+        self.prices = prices
+        self.balances = balances
+        self.target_usd = target_usd
+        self.current_usd = current_usd
+        self.diff_usd = diff_usd  # Diferencia bruta objetivo - actual
+        self.order_usd = order_usd  # Importe final a operar (0 = sin orden); >0 compra, <0 venta
+        self.total_usd = total_usd
+        self.cash = cash
+        self.decided_at = None  # time.perf_counter() de la decisión (latencia hasta el fill)
+
+    def sells(self):
+        return [(self.symbols[i], float(self.order_usd[i]), float(self.prices[i]))
+                for i in np.flatnonzero(self.order_usd < 0)]
+
+    def buys(self):
+        return [(self.symbols[i], float(self.order_usd[i]), float(self.prices[i]))
+                for i in np.flatnonzero(self.order_usd > 0)]
+
+    def trades(self):
+        """(symbol, usd, price) de cada orden: ventas primero, luego compras"""
+        return self.sells() + self.buys()
+
+    def __len__(self):
+        return int(np.count_nonzero(self.order_usd))
+
+    def describe(self):
+        """Tabla legible del plan (para dry-run y logs)"""
+        lines = [f"Plan: total ${self.total_usd:,.2f} | USDC ${self.cash:,.2f} | {len(self)} órdenes"]
+        for i, symbol in enumerate(self.symbols):
+            lines.append(f"  {symbol:<10} w={self.weights[i]:.2f} actual=${self.current_usd[i]:,.2f} "
+                         f"objetivo=${self.target_usd[i]:,.2f} diff=${self.diff_usd[i]:+,.2f} "
+                         f"orden=${self.order_usd[i]:+,.2f}")
+        return "\n".join(lines)
+
+
+def plan_rebalance(symbols, weights, prices, balances, active, total_usd, cash, allocation, min_trade):
+    """Pesos, objetivos y diferencias de todos los símbolos en una pasada vectorizada
+
+    `active` marca los símbolos que pueden operar este ciclo (cambio de peso, manual o inicial).
+    Las compras se reparten en orden con el USDC libre más lo que liberan las ventas.
+    """
+    weights = np.asarray(weights, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    balances = np.asarray(balances, dtype=float)
+    active = np.asarray(active, dtype=bool)
+    target_usd, current_usd, diff_usd, order_usd = plan_orders(weights, prices, balances, active, total_usd, cash,
+                                                               allocation, min_trade)
+    return RebalancePlan(symbols, weights, prices, balances, target_usd, current_usd, diff_usd,
+                         order_usd, total_usd, cash)
+
+
+def plan_orders(weights, prices, balances, active, total_usd, cash, allocation, min_trade):
+    """Núcleo de plan_rebalance sobre arrays float/bool: (objetivo, actual, diferencia, orden) en USD"""
+    target_usd = total_usd * allocation * np.minimum(1.0, weights)
+    current_usd = balances * prices
+    diff_usd = target_usd - current_usd
+
+    tradable = active & (np.abs(diff_usd) > min_trade) & (prices > 0)
+    sells = tradable & (diff_usd < 0)
+    buys = tradable & (diff_usd > 0)
+
+    # ✅ RESTRICCIÓN DE CAJA GLOBAL: cada compra recibe lo que queda tras las anteriores
+    available = cash - diff_usd[sells].sum()
+    wanted = np.where(buys, diff_usd, 0.0)
+    before = np.cumsum(wanted) - wanted
+    allotted = np.clip(available - before, 0.0, wanted)
+    buys &= allotted > min_trade
+
+    order_usd = np.where(sells, diff_usd, np.where(buys, allotted, 0.0))
+    return target_usd, current_usd, diff_usd, order_usd
@@ -0,0 +1,47 @@
+# Archivo: rebalance_triggers.py
+import threading
+import time
+
+
+class RebalanceTriggers:
+    """Eventos que justifican un rebalanceo: velas nuevas, fin de cooldown o petición manual"""
+
+    def __init__(self, debounce=1.0):
+        self.debounce = debounce  # Agrupa ráfagas de ticks en una sola evaluación
+        self.dirty = set()  # Símbolos con velas actualizadas desde la última evaluación
+        self.manual = False
+        self._woken = False
+        self._cond = threading.Condition()
+
+    def on_kline(self, symbol, interval, row, closed):
+        """Callback del MarketStream (hilo del WebSocket): solo marca, sin calcular"""
+        with self._cond:
+            self.dirty.add(symbol)
+            self._cond.notify_all()
+
+    def request_manual(self):
+        with self._cond:
+            self.manual = True
+            self._cond.notify_all()
+
+    def wake(self):
+        """Despierta al bot sin evento (p. ej. al parar)"""
+        with self._cond:
+            self._woken = True
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Bloquea hasta un evento o `timeout`; devuelve (símbolos con velas nuevas, manual) y los consume"""
+        with self._cond:
+            if not self.dirty and not self.manual and not self._woken:
+                self._cond.wait(timeout)
+            self._woken = False
+            if self.dirty and not self.manual and self.debounce:
+                deadline = time.monotonic() + self.debounce
+                remaining = self.debounce
+                while remaining > 0 and not self.manual:
+                    self._cond.wait(remaining)
+                    remaining = deadline - time.monotonic()
+            dirty, manual = self.dirty, self.manual
+            self.dirty, self.manual = set(), False
+            return dirty, manual
@@ -0,0 +1,227 @@
+# Archivo: request_scheduler.py
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+# ✅ PRIORIDADES (menor = antes)
+PRIORITY_ORDER = 0
+PRIORITY_MARKET = 1
+PRIORITY_GUI = 2
+
+# ✅ PESO POR ENDPOINT (documentación de Binance; 1 por defecto)
+ENDPOINT_WEIGHTS = {
+    'get_klines': 2,
+    'get_account': 20,
+    'get_symbol_ticker': 4,
+    'get_all_tickers': 4,
+    'get_ticker': 80,
+    'get_exchange_info': 20,
+    'get_symbol_info': 20,
+    'get_my_trades': 20,
+    'get_trade_fee': 1,
+    'stream_get_listen_key': 2,
+    'stream_keepalive': 2,
+    'stream_close': 2,
+}
+ORDER_METHODS = {'order_market_buy', 'order_market_sell', 'create_order', 'order_market', 'order_limit'}
+
+_context = threading.local()
+
+
+class RequestShed(Exception):
+    """Petición de baja prioridad descartada por presión de rate limit"""
+
+
+@contextmanager
+def request_priority(priority):
+    """Prioridad de las llamadas a la API hechas en este hilo"""
+    previous = getattr(_context, 'priority', PRIORITY_MARKET)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority():
+    return getattr(_context, 'priority', PRIORITY_MARKET)
+
+
+class TokenBucket:
+    def __init__(self, capacity, interval):
+        self.capacity = capacity
+        self.rate = capacity / interval
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def sync_used(self, used):
+        """Ajusta al contador del servidor (nunca por encima de lo que queda)"""
+        self.tokens = min(self.tokens, self.capacity - used)
+
+    def wait_time(self, amount):
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def usage(self):
+        return 1.0 - self.tokens / self.capacity
+
+
+class RequestScheduler:
+    """Token buckets de peso y órdenes, sincronizados con las cabeceras X-MBX-*, con cola por prioridad"""
+
+    def __init__(self, weight_per_minute=6000, orders_per_10s=50, orders_per_day=160000, gui_shed_ratio=0.7):
+        self.weight = TokenBucket(weight_per_minute, 60)
+        self.orders_10s = TokenBucket(orders_per_10s, 10)
+        self.orders_day = TokenBucket(orders_per_day, 86400)
+        self.gui_shed_ratio = gui_shed_ratio
+        self.banned_until = 0.0
+        self.shed_count = 0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def _ready(self, weight, is_order):
+        if self.weight.tokens < weight:
+            return self.weight.wait_time(weight)
+        if is_order:
+            for bucket in (self.orders_10s, self.orders_day):
+                if bucket.tokens < 1:
+                    return bucket.wait_time(1)
+        return 0.0
+
+    def acquire(self, weight=1, is_order=False, priority=None):
+        """Bloquea hasta que haya presupuesto; las prioridades altas pasan primero"""
+        priority = PRIORITY_ORDER if is_order else (current_priority() if priority is None else priority)
+        ticket = (priority, next(self._counter))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    for bucket in (self.weight, self.orders_10s, self.orders_day):
+                        bucket.refill(now)
+                    # ✅ BAJO PRESIÓN SE DESCARTA PRIMERO EL TRABAJO DE LA GUI
+                    if priority >= PRIORITY_GUI and self.weight.usage() > self.gui_shed_ratio:
+                        self.shed_count += 1
+                        raise RequestShed(f"rate limit al {self.weight.usage():.0%}")
+                    wait = max(0.0, self.banned_until - now)
+                    if not wait and self._waiting[0] == ticket:
+                        wait = self._ready(weight, is_order)
+                        if not wait:
+                            self.weight.tokens -= weight
+                            if is_order:
+                                self.orders_10s.tokens -= 1
+                                self.orders_day.tokens -= 1
+                            return
+                    self._cond.wait(min(wait, 1.0) if wait else 0.05)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def try_acquire(self, weight=1, is_order=False, priority=PRIORITY_MARKET):
+        """Versión sin bloqueo de acquire: 0 si se concede, si no segundos a esperar"""
+        priority = PRIORITY_ORDER if is_order else priority
+        with self._cond:
+            now = time.monotonic()
+            for bucket in (self.weight, self.orders_10s, self.orders_day):
+                bucket.refill(now)
+            if priority >= PRIORITY_GUI and self.weight.usage() > self.gui_shed_ratio:
+                self.shed_count += 1
+                raise RequestShed(f"rate limit al {self.weight.usage():.0%}")
+            wait = max(0.0, self.banned_until - now)
+            if not wait and self._waiting and self._waiting[0][0] <= priority:
+                wait = 0.05  # ✅ HILOS CON IGUAL O MAYOR PRIORIDAD ESPERANDO - CEDER EL TURNO
+            if not wait:
+                wait = self._ready(weight, is_order)
+                if not wait:
+                    self.weight.tokens -= weight
+                    if is_order:
+                        self.orders_10s.tokens -= 1
+                        self.orders_day.tokens -= 1
+                    return 0.0
+            return min(wait, 1.0)
+
+    def on_response(self, response, *args, **kwargs):
+        """Hook de requests: sincroniza con X-MBX-USED-WEIGHT y X-MBX-ORDER-COUNT"""
+        headers = response.headers
+        with self._cond:
+            used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MBX-USED-WEIGHT')
+            if used:
+                self.weight.sync_used(int(used))
+            orders_10s = headers.get('X-MBX-ORDER-COUNT-10S')
+            if orders_10s:
+                self.orders_10s.sync_used(int(orders_10s))
+            orders_day = headers.get('X-MBX-ORDER-COUNT-1D')
+            if orders_day:
+                self.orders_day.sync_used(int(orders_day))
+            # ✅ 429/418: PARAR TODO HASTA Retry-After
+            if response.status_code in (418, 429):
+                retry_after = float(headers.get('Retry-After', 60))
+                self.banned_until = max(self.banned_until, time.monotonic() + retry_after)
+                print(f"🚫 Rate limit {response.status_code} - pausa de {retry_after:.0f}s")
+            self._cond.notify_all()
+        return response
+
+    def status(self):
+        return {
+            'weight_used': self.weight.capacity - self.weight.tokens,
+            'weight_usage': self.weight.usage(),
+            'orders_10s_used': self.orders_10s.capacity - self.orders_10s.tokens,
+            'shed': self.shed_count,
+            'banned_for': max(0.0, self.banned_until - time.monotonic())
+        }
+
+
+class ScheduledClient:
+    """Proxy del cliente Binance: cada método pasa por el RequestScheduler"""
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_') or name == 'close_connection':
+            return attr
+        weight = ENDPOINT_WEIGHTS.get(name, 1)
+        is_order = name in ORDER_METHODS
+        scheduler = self._scheduler
+
+        def scheduled(*args, **kwargs):
+            scheduler.acquire(weight, is_order)
+            return attr(*args, **kwargs)
+        scheduled.__name__ = name
+        return scheduled
+
+
+class AsyncScheduledClient:
+    """Proxy del AsyncClient: espera presupuesto con asyncio.sleep en vez de bloquear el event loop"""
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_') or name == 'close_connection':
+            return attr
+        weight = ENDPOINT_WEIGHTS.get(name, 1)
+        is_order = name in ORDER_METHODS
+        scheduler = self._scheduler
+
+        async def scheduled(*args, **kwargs):
+            while True:
+                wait = scheduler.try_acquire(weight, is_order)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+            return await attr(*args, **kwargs)
+        scheduled.__name__ = name
+        return scheduled
@@ -0,0 +1,98 @@
+# Archivo: single_flight.py
+import threading
+import time
+
+from request_scheduler import RequestShed, current_priority
+
+# ✅ TTL POR ENDPOINT (0 = solo se comparten las llamadas simultáneas). Las órdenes nunca se agrupan.
+COALESCE_TTLS = {
+    'get_account': 0.0,  # El AccountSnapshot ya cachea e invalida tras cada fill
+    'get_klines': 1.0,
+    'get_symbol_ticker': 1.0,
+    'get_all_tickers': 1.0,
+    'get_ticker': 5.0,
+    'get_exchange_info': 60.0,
+    'get_my_trades': 10.0,
+    'get_trade_fee': 60.0,
+}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = 0.0
+        self.priority = current_priority()  # Prioridad con la que el líder espera en el scheduler
+
+
+class CoalescingClient:
+    """Proxy single-flight: llamadas idénticas concurrentes (endpoint + params) se envían una sola vez"""
+
+    def __init__(self, client, ttls=None):
+        self._client = client
+        self._ttls = COALESCE_TTLS if ttls is None else ttls
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._leader_calls = 0
+        self.coalesced = 0  # Llamadas ahorradas
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self._ttls or not callable(attr):
+            return attr
+        ttl = self._ttls[name]
+
+        def coalesced(*args, **kwargs):
+            key = (name, repr(args), repr(sorted(kwargs.items())))
+            while True:
+                flight, leader = self._join(key, ttl)
+                if leader:
+                    try:
+                        flight.result = attr(*args, **kwargs)
+                    except Exception as e:
+                        flight.error = e
+                    finally:
+                        flight.finished_at = time.time()
+                        flight.done.set()
+                        if flight.error is not None or not ttl:
+                            with self._lock:
+                                if self._flights.get(key) is flight:
+                                    del self._flights[key]
+                else:
+                    flight.done.wait()
+                    # ✅ EL DESCARTE ES DE LA PRIORIDAD DEL LÍDER, NO DE ESTE HILO: REINTENTAR CON LA PROPIA
+                    if isinstance(flight.error, RequestShed):
+                        continue
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+        coalesced.__name__ = name
+        return coalesced
+
+    def _join(self, key, ttl):
+        """(vuelo, es_líder): solo se espera a un líder con prioridad igual o más alta que la propia"""
+        priority = current_priority()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                if flight.done.is_set():
+                    fresh = flight.error is None and time.time() - flight.finished_at < ttl
+                else:
+                    fresh = flight.priority <= priority
+                if fresh:
+                    self.coalesced += 1
+                    return flight, False
+            # ✅ NUEVO VUELO (sustituye al de menor prioridad en curso; sus seguidores siguen esperándolo)
+            flight = self._flights[key] = _Flight()
+            self._leader_calls += 1
+            if self._leader_calls % 256 == 0:
+                self._purge_locked()
+            return flight, True
+
+    def _purge_locked(self):
+        """Elimina resultados caducados para que la cache no crezca sin límite"""
+        now = time.time()
+        for key in [k for k, f in self._flights.items()
+                    if f.done.is_set() and now - f.finished_at >= self._ttls.get(k[0], 0)]:
+            del self._flights[key]
@@ -0,0 +1,15 @@
+# Archivo: strategy_config.py
+# ✅ PARÁMETROS DE LA ESTRATEGIA SIN DEPENDENCIAS: el backtester y el barrido los importan
+# sin API keys ni python-binance (config.py los reexporta para el bot)
+
+SYMBOLS = ["BNBUSDC", "FETUSDC", "SOLUSDC", "LINKUSDC", "XLMUSDC"]
+TIMEFRAMES = {"30m": "30m", "1h": "1h", "2h": "2h"}
+TIMEFRAME_WEIGHTS = {"30m": 0.30, "1h": 0.30, "2h": 0.40}
+MIN_TRADE_DIFF = 15
+SWEEP_RESULTS_FILE = "sweep_results.jsonl"  # Resultados del barrido de parámetros (reanudable)
+
+# ✅ MINUTOS POR INTERVALO (solo los alineados a UTC que se pueden construir desde velas menores)
+INTERVAL_MINUTES = {
+    "1m": 1, "3m": 3, "5m": 5, "15m": 15, "30m": 30,
+    "1h": 60, "2h": 120, "4h": 240, "6h": 360, "8h": 480, "12h": 720, "1d": 1440
+}
@@ -0,0 +1,85 @@
+# Archivo: strategy_state.py
+import os
+import time
+
+import numpy as np
+
+# ✅ CÓDIGOS COMPACTOS (int8) PARA LAS MATRICES (símbolo × timeframe)
+COLOR_CODES = {"RED": 0, "YELLOW": 1, "GREEN": 2}
+COLOR_NAMES = ["RED", "YELLOW", "GREEN"]
+NO_COLOR = -1  # Sin señal previa
+DIRECTION_CODES = {None: 0, "NEUTRAL": 1, "POSITIVE": 2, "NEGATIVE": 3}
+DIRECTION_NAMES = [None, "NEUTRAL", "POSITIVE", "NEGATIVE"]
+COLOR_FACTORS = np.array([0.0, 0.5, 1.0])  # Fracción del peso del timeframe por color
+
+
+class StrategyState:
+    """Estado de la estrategia como matrices NumPy indexadas por (símbolo, timeframe)"""
+
+    def __init__(self, symbols, timeframes, timeframe_weights):
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.tf_index = {tf: j for j, tf in enumerate(self.timeframes)}
+        self.tf_weights = np.array([timeframe_weights[tf] for tf in self.timeframes], dtype=float)
+
+        shape = (len(self.symbols), len(self.timeframes))
+        self.colors = np.full(shape, NO_COLOR, dtype=np.int8)  # Último color visto
+        self.directions = np.zeros(shape, dtype=np.int8)  # Última dirección (DIRECTION_CODES)
+        self.deadlines = np.zeros(shape)  # Fin de cooldown (time.time); 0 = sin cooldown
+        self.locked = np.full(shape, np.nan)  # Peso bloqueado por timeframe; NaN = sin bloqueo
+
+    def encode(self, signals):
+        """{tf: color} → fila de códigos alineada con self.timeframes"""
+        return np.array([COLOR_CODES.get(signals.get(tf), 0) for tf in self.timeframes], dtype=np.int8)
+
+    def weights(self, rows, codes, now):
+        """Peso total de varios símbolos: producto escalar enmascarado por los bloqueos de cada uno"""
+        rows = np.asarray(rows, dtype=np.intp)
+        codes = np.asarray(codes, dtype=np.intp).reshape(len(rows), len(self.timeframes))
+        locked = self.locked[rows]
+        mask = (self.deadlines[rows] > now) & ~np.isnan(locked)
+        free = np.where(mask, 0.0, COLOR_FACTORS[codes]) @ self.tf_weights
+        return free + np.where(mask, locked, 0.0).sum(axis=1)
+
+    def active_cooldowns(self, row, now):
+        """Índices de timeframe con cooldown activo para un símbolo"""
+        return np.flatnonzero(self.deadlines[row] > now)
+
+    def save(self, path, last_weights, first_rebalance_done):
+        """Checkpoint atómico (.npz comprimido) del estado y los últimos pesos"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f, symbols=np.array(self.symbols), timeframes=np.array(self.timeframes),
+                colors=self.colors, directions=self.directions, deadlines=self.deadlines, locked=self.locked,
+                last_weights=np.array([last_weights.get(s, 0.0) for s in self.symbols]),
+                first_rebalance_done=np.array(first_rebalance_done), saved_at=np.array(time.time()))
+        os.replace(tmp_path, path)
+
+    def load(self, path, max_age_seconds):
+        """Restaura por nombre de símbolo/timeframe; devuelve (last_weights, first_rebalance_done) o None"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if time.time() - float(data['saved_at']) > max_age_seconds:
+                return None
+            # ✅ SOLO LOS SÍMBOLOS Y TIMEFRAMES QUE SIGUEN CONFIGURADOS
+            saved_tfs = [str(tf) for tf in data['timeframes']]
+            cols = [(j, saved_tfs.index(tf)) for j, tf in enumerate(self.timeframes) if tf in saved_tfs]
+            if not cols:
+                return None
+            dst_cols, src_cols = [c[0] for c in cols], [c[1] for c in cols]
+            last_weights = {}
+            for k, symbol in enumerate(str(s) for s in data['symbols']):
+                i = self.symbol_index.get(symbol)
+                if i is None:
+                    continue
+                self.colors[i, dst_cols] = data['colors'][k, src_cols]
+                self.directions[i, dst_cols] = data['directions'][k, src_cols]
+                self.deadlines[i, dst_cols] = data['deadlines'][k, src_cols]
+                self.locked[i, dst_cols] = data['locked'][k, src_cols]
+                last_weights[symbol] = float(data['last_weights'][k])
+            # ✅ SI FALTA ALGÚN SÍMBOLO NUEVO SE HACE REBALANCEO INICIAL
+            first_done = bool(data['first_rebalance_done']) and len(last_weights) == len(self.symbols)
+            return last_weights, first_done
@@ -0,0 +1,161 @@
+# Archivo: symbol_filters.py
+import json
+import os
+import threading
+import time
+
+QTY_SCALE = 10 ** 8  # Binance usa como máximo 8 decimales
+
+
+def to_units(value):
+    """Decimal de Binance (str/float) → entero en unidades de 1e-8"""
+    return int(round(float(value) * QTY_SCALE))
+
+
+def step_decimals(step_units):
+    """Decimales necesarios para representar un step"""
+    decimals = 8
+    while decimals > 0 and step_units % 10 == 0:
+        step_units //= 10
+        decimals -= 1
+    return decimals
+
+
+class SymbolFilters:
+    """Filtros LOT_SIZE / MARKET_LOT_SIZE / MIN_NOTIONAL / PRICE_FILTER cargados al inicio y persistidos en disco"""
+
+    def __init__(self, client, symbols, path="exchange_filters.json", refresh_hours=6):
+        self.client = client
+        self.symbols = list(symbols)
+        self.path = path
+        self.refresh_seconds = refresh_hours * 3600
+        self.filters = {}  # symbol -> dict con enteros precalculados
+        self.usdc_symbols = set()  # Todos los pares *USDC operables (para valorar la cuenta)
+        self.loaded_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Carga desde disco si es reciente; si no, una sola llamada a exchangeInfo"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    cached = json.load(f)
+                if (time.time() - cached.get('loaded_at', 0) < self.refresh_seconds and
+                        all(s in cached.get('symbols', {}) for s in self.symbols)):
+                    self._set(cached['symbols'], cached['loaded_at'])
+                    self.usdc_symbols = set(cached.get('usdc_symbols', []))
+                    return
+        except Exception as e:
+            print(f"⚠️ Error leyendo {self.path}: {e}")
+        self.refresh()
+
+    def refresh(self):
+        """Descarga exchangeInfo y guarda solo los símbolos configurados"""
+        info = self.client.get_exchange_info()
+        raw = {}
+        usdc_symbols = set()
+        for symbol_info in info.get('symbols', []):
+            if symbol_info['symbol'] in self.symbols:
+                raw[symbol_info['symbol']] = {f['filterType']: f for f in symbol_info['filters']}
+            if symbol_info.get('quoteAsset') == 'USDC' and symbol_info.get('status') == 'TRADING':
+                usdc_symbols.add(symbol_info['symbol'])
+        loaded_at = time.time()
+        self._set(raw, loaded_at)
+        self.usdc_symbols = usdc_symbols
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({'loaded_at': loaded_at, 'symbols': raw, 'usdc_symbols': sorted(usdc_symbols)}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Error guardando {self.path}: {e}")
+
+    def _set(self, raw, loaded_at):
+        parsed = {symbol: self._parse(filters) for symbol, filters in raw.items()}
+        with self._lock:
+            self.filters = parsed
+            self.loaded_at = loaded_at
+
+    def _parse(self, filters):
+        """Precalcula steps y límites como enteros (unidades de 1e-8)"""
+        lot = filters.get('LOT_SIZE', {})
+        market_lot = filters.get('MARKET_LOT_SIZE', {})
+        notional = filters.get('MIN_NOTIONAL') or filters.get('NOTIONAL') or {}
+        price = filters.get('PRICE_FILTER', {})
+        # ✅ LAS ÓRDENES DE MERCADO USAN MARKET_LOT_SIZE; stepSize 0 SIGNIFICA "EL DE LOT_SIZE"
+        step = to_units(market_lot.get('stepSize', '0')) or to_units(lot.get('stepSize', '0')) or 1
+        max_qtys = [q for q in (to_units(lot.get('maxQty', '0')), to_units(market_lot.get('maxQty', '0'))) if q]
+        tick = to_units(price.get('tickSize', '0')) or 1
+        return {
+            'step': step,
+            'step_decimals': step_decimals(step),
+            'min_qty': max(to_units(lot.get('minQty', '0')), to_units(market_lot.get('minQty', '0'))),
+            'max_qty': min(max_qtys) if max_qtys else 0,
+            'min_notional': float(notional.get('minNotional', 0)),
+            'tick': tick,
+            'min_price': to_units(price.get('minPrice', '0')),
+            'max_price': to_units(price.get('maxPrice', '0'))
+        }
+
+    def get(self, symbol):
+        """Filtros del símbolo; refresca en segundo plano si han caducado"""
+        if symbol not in self.filters:
+            self.refresh()
+        elif time.time() - self.loaded_at >= self.refresh_seconds and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+        return self.filters.get(symbol)
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"⚠️ Error refrescando filtros: {e}")
+        finally:
+            self._refreshing = False
+
+    def round_quantity(self, symbol, quantity):
+        """Redondea hacia abajo al stepSize de mercado con aritmética entera"""
+        f = self.get(symbol)
+        if not f:
+            return quantity
+        units = to_units(quantity) // f['step'] * f['step']
+        return round(units / QTY_SCALE, f['step_decimals'])
+
+    def round_price(self, symbol, price):
+        """Redondea hacia abajo al tickSize con aritmética entera"""
+        f = self.get(symbol)
+        if not f:
+            return price
+        units = to_units(price) // f['tick'] * f['tick']
+        return units / QTY_SCALE
+
+    def round_quote(self, amount):
+        """Importe en moneda cotizada truncado a 8 decimales (quoteOrderQty)"""
+        return max(0, int(float(amount) * QTY_SCALE)) / QTY_SCALE
+
+    def validate_quote(self, symbol, amount):
+        """(ok, motivo) para una orden de mercado por importe (quoteOrderQty)"""
+        f = self.get(symbol)
+        if amount <= 0:
+            return False, f"importe {amount} no válido"
+        if f and amount < f['min_notional']:
+            return False, f"notional ${amount:.2f} < minNotional ${f['min_notional']:.2f}"
+        return True, ""
+
+    def validate(self, symbol, quantity, price):
+        """(ok, motivo) - rechaza localmente órdenes que Binance rechazaría"""
+        f = self.get(symbol)
+        if not f:
+            return True, ""
+        units = to_units(quantity)
+        if units <= 0 or units < f['min_qty']:
+            return False, f"cantidad {quantity} < minQty {f['min_qty'] / QTY_SCALE}"
+        if f['max_qty'] and units > f['max_qty']:
+            return False, f"cantidad {quantity} > maxQty {f['max_qty'] / QTY_SCALE}"
+        if units % f['step']:
+            return False, f"cantidad {quantity} no es múltiplo de stepSize {f['step'] / QTY_SCALE}"
+        if price and quantity * price < f['min_notional']:
+            return False, f"notional ${quantity * price:.2f} < minNotional ${f['min_notional']:.2f}"
+        return True, ""
@@ -1,9 +1,15 @@
 # Archivo: trading_bot.py - VERSIÓN SIN INICIO AUTOMÁTICO
-from binance.client import Client
-from config import API_KEY, API_SECRET, UPDATE_INTERVAL
+from client_factory import get_client, close_client, metrics
+from config import (UPDATE_INTERVAL, SYMBOLS, STREAMING_ENABLED, STREAM_URL,
+                    USER_STREAM_ENABLED, USER_STREAM_URL, ENGINE, EVENT_DRIVEN,
+                    EVENT_DEBOUNCE_SECONDS, EVENT_HEARTBEAT_SECONDS)
 from indicators import Indicators
+from market_stream import MarketStream
+from user_stream import UserDataStream
 from binance_account import BinanceAccount
 from capital_manager import CapitalManager
+from async_engine import AsyncTradingEngine
+from rebalance_triggers import RebalanceTriggers
 import time
 import threading
 import logging
@@ -17,10 +23,37 @@ class TradingBot:
         self.gui = gui
         print(f"🤖 Bot GUI asignada: {self.gui is not None}")
 
-        self.client = Client(API_KEY, API_SECRET)
+        self.client = get_client()  # ✅ Cliente compartido con la cuenta y la GUI
         self.indicators = Indicators(self.client)
         self.account = BinanceAccount(None)  # ✅ Inicialmente sin GUI
         self.manager = CapitalManager(self.account, self.indicators, None)  # ✅ Inicialmente sin GUI
+        self.manager.load_state()  # ✅ Arranque en caliente (sin INITIAL REBALANCE si hay checkpoint)
+        
+        # ✅ STREAMING OPCIONAL DE KLINES Y PRECIOS
+        self.stream = None
+        if STREAMING_ENABLED:
+            self.stream = MarketStream(self.indicators.store, SYMBOLS,
+                                       self.indicators.fetch_intervals(), STREAM_URL)
+            self.account.price_book.stream = self.stream
+        
+        # ✅ USER DATA STREAM OPCIONAL (libro de balances local)
+        self.user_stream = None
+        if USER_STREAM_ENABLED:
+            self.user_stream = UserDataStream(self.account.client, self.account.snapshot, USER_STREAM_URL)
+        
+        # ✅ REBALANCEO POR EVENTOS: LAS VELAS DEL STREAM DESPIERTAN AL BOT
+        self.triggers = None
+        if EVENT_DRIVEN:
+            if self.stream:
+                self.triggers = RebalanceTriggers(EVENT_DEBOUNCE_SECONDS)
+                self.stream.on_kline = self.triggers.on_kline
+            else:
+                print("⚠️ EVENT_DRIVEN requiere STREAMING_ENABLED - usando bucle fijo")
+        
+        # ✅ MOTOR ASYNCIO OPCIONAL (sustituye al hilo de loop)
+        self.engine = None
+        if ENGINE == "asyncio":
+            self.engine = AsyncTradingEngine(self.manager, self.account, self.indicators, UPDATE_INTERVAL)
         self.running = False
         self.thread = None
         self.force_stop = False
@@ -46,8 +79,16 @@ class TradingBot:
                 return
             
             self.running = True
-            self.thread = threading.Thread(target=self.loop, daemon=True)
-            self.thread.start()
+            if self.stream:
+                self.stream.start()
+            if self.user_stream:
+                self.user_stream.start()
+            if self.engine:
+                self.engine.start()
+            else:
+                target = self.event_loop if self.triggers else self.loop
+                self.thread = threading.Thread(target=target, daemon=True)
+                self.thread.start()
             print("🤖 Bot Started - GUI completamente conectada")
             if self.gui: 
                 self.gui.log_trade("🤖 Bot Started", 'GREEN')
@@ -55,6 +96,10 @@ class TradingBot:
     def stop(self):
         """Parada normal"""
         self.running = False
+        if self.engine:
+            self.engine.stop()
+        if self.triggers:
+            self.triggers.wake()
         logging.info("Bot stopped")
         if self.gui: 
             self.gui.log_trade("Bot stopped", 'RED')
@@ -70,11 +115,22 @@ class TradingBot:
         self.force_stop = True
         self.running = False
         
+        if self.engine:
+            self.engine.stop()
+        if self.triggers:
+            self.triggers.wake()
+        if self.stream:
+            self.stream.stop()
+        if self.user_stream:
+            self.user_stream.stop()
+        
+        metrics.dump()
+        self.manager.save_state()
+        
         try:
             # ✅ CERRAR CONEXIÓN DE BINANCE
-            if hasattr(self.client, 'close_connection'):
-                self.client.close_connection()
-                print("✅ Conexión de Binance cerrada")
+            close_client()
+            print("✅ Conexión de Binance cerrada")
         except Exception as e:
             print(f"⚠️ Error cerrando conexión: {e}")
         
@@ -97,8 +153,17 @@ class TradingBot:
         print("✅ Bot completamente detenido - listo para reinicio")
     
     def rebalance_manual(self):
+        if self.triggers and self.running:
+            # ✅ EL HILO DEL BOT LO EJECUTA (sin dos rebalanceos a la vez)
+            self.triggers.request_manual()
+            if self.gui:
+                self.gui.log_trade("Manual rebalance solicitado", 'BLUE')
+            return
         try:
-            result = self.manager.rebalance(manual=True)
+            if self.engine and self.engine.running:
+                result = self.engine.rebalance_threadsafe(manual=True)
+            else:
+                result = self.manager.rebalance(manual=True)
             logging.info(f"Manual rebalance: {result}")
             if self.gui: 
                 self.gui.log_trade(f"Manual rebalance: {result}", 'GREEN')
@@ -121,6 +186,7 @@ class TradingBot:
                     and self.gui is not None):
                     
                     self.manager.rebalance()
+                    metrics.maybe_dump()
                 else:
                     print("⏳ Esperando conexión GUI completa...")
                     # ✅ VERIFICAR force_stop DURANTE LA ESPERA
@@ -141,4 +207,56 @@ class TradingBot:
                     break
                 logging.error(f"Error in bot loop: {e}")
                 if not self.force_stop:
-                    time.sleep(10)
\ No newline at end of file
+                    time.sleep(10)
+    
+    def event_loop(self):
+        """✅ BUCLE POR EVENTOS: duerme hasta una vela nueva, el fin de un cooldown o una petición manual"""
+        last_full = 0.0
+        retry_manual = False
+        while self.running and not self.force_stop:
+            try:
+                if self.manager.gui is None or self.gui is None:
+                    print("⏳ Esperando conexión GUI completa...")
+                    time.sleep(1)
+                    continue
+                
+                # ✅ PRIMER CICLO (o latido de seguridad): REBALANCEO COMPLETO
+                now = time.time()
+                if not self.manager.first_rebalance_done or (
+                        EVENT_HEARTBEAT_SECONDS and now - last_full >= EVENT_HEARTBEAT_SECONDS):
+                    result = self.manager.rebalance(manual=retry_manual)
+                    metrics.maybe_dump()
+                    last_full = time.time()
+                    retry_manual = False
+                    if result == "No capital" or not self.manager.first_rebalance_done:
+                        # ✅ SIN CAPITAL O API CAÍDA: ESPERAR ANTES DE REINTENTAR (sin girar ni saturar REST)
+                        _, retry_manual = self.triggers.wait(UPDATE_INTERVAL)
+                    continue
+                
+                # ✅ DORMIR HASTA EL PRÓXIMO EVENTO O PLAZO
+                wake_at = [t for t in (self.manager.next_cooldown_deadline(),
+                                       last_full + EVENT_HEARTBEAT_SECONDS if EVENT_HEARTBEAT_SECONDS else None) if t]
+                timeout = max(0.0, min(wake_at) - now) if wake_at else None
+                dirty, manual = self.triggers.wait(timeout)
+                if not self.running or self.force_stop:
+                    break
+                
+                if manual:
+                    result = self.manager.rebalance(manual=True)
+                    last_full = time.time()
+                    logging.info(f"Manual rebalance: {result}")
+                    if self.gui:
+                        self.gui.log_trade(f"Manual rebalance: {result}", 'GREEN')
+                    continue
+                
+                # ✅ SOLO LOS SÍMBOLOS CON COLOR NUEVO O COOLDOWN TERMINADO
+                affected = self.manager.changed_symbols(dirty) | self.manager.update_cooldowns()
+                if affected:
+                    self.manager.rebalance(symbols=[s for s in SYMBOLS if s in affected])
+                    metrics.maybe_dump()
+                    
+            except Exception as e:
+                if self.force_stop:
+                    break
+                logging.error(f"Error in bot event loop: {e}")
+                time.sleep(10)
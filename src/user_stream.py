@@ -0,0 +1,81 @@
+# Archivo: user_stream.py
+import threading
+
+from market_stream import ReconnectingWebSocket
+
+
+class UserDataStream(ReconnectingWebSocket):
+    """User data stream: mantiene el AccountSnapshot como libro de balances local"""
+
+    name = "UserDataStream"
+    KEEPALIVE_SECONDS = 30 * 60  # Binance caduca el listenKey a los 60 min
+
+    def __init__(self, client, snapshot, url="wss://stream.binance.com:9443"):
+        super().__init__()
+        self.client = client
+        self.snapshot = snapshot
+        self.url = url.rstrip('/')
+        self.listen_key = None
+        self.on_execution = None  # callback(executionReport) opcional
+        self._keepalive_stop = threading.Event()
+        self._keepalive_thread = None
+
+    def stream_url(self):
+        # ✅ NUEVO listenKey EN CADA CONEXIÓN (el anterior puede haber caducado)
+        self.listen_key = self.client.stream_get_listen_key()
+        return f"{self.url}/ws/{self.listen_key}"
+
+    def start(self):
+        if not super().start():
+            return False
+        self._keepalive_stop.clear()
+        self._keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True,
+                                                  name="UserDataKeepalive")
+        self._keepalive_thread.start()
+        return True
+
+    def stop(self):
+        self._keepalive_stop.set()
+        super().stop()
+        if self.listen_key:
+            try:
+                self.client.stream_close(listenKey=self.listen_key)
+            except Exception:
+                pass
+            self.listen_key = None
+
+    def _keepalive_loop(self):
+        while not self._keepalive_stop.wait(self.KEEPALIVE_SECONDS):
+            if self.listen_key:
+                try:
+                    self.client.stream_keepalive(listenKey=self.listen_key)
+                except Exception as e:
+                    print(f"⚠️ Error en keepalive del listenKey: {e}")
+
+    def on_connected(self):
+        # ✅ RESINCRONIZAR POR REST Y PASAR A MODO STREAM
+        try:
+            self.snapshot.invalidate()
+            self.snapshot.get()
+            self.snapshot.stream_backed = True
+        except Exception as e:
+            print(f"⚠️ Error resincronizando balances: {e}")
+
+    def on_disconnected(self):
+        # ✅ VOLVER A POLLING CON TTL HASTA LA RECONEXIÓN
+        self.snapshot.stream_backed = False
+        self.snapshot.invalidate()
+
+    def handle(self, data):
+        event = data.get('e')
+        if event == 'outboundAccountPosition':
+            self.snapshot.update_balances({
+                b['a']: {'free': float(b['f']), 'locked': float(b['l'])} for b in data['B']
+            }, data.get('u', 0))
+        elif event == 'balanceUpdate':
+            self.snapshot.apply_delta(data['a'], float(data['d']))
+        elif event == 'executionReport':
+            # ✅ EL FILL SE APLICA YA; EL outboundAccountPosition POSTERIOR FIJA LOS VALORES ABSOLUTOS
+            self.snapshot.apply_execution(data)
+            if self.on_execution:
+                self.on_execution(data)
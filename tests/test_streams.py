@@ -0,0 +1,179 @@
+# tests/test_streams.py - MarketStream y UserDataStream contra un servidor WebSocket local
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("websocket")
+pytest.importorskip("dotenv")
+pytest.importorskip("binance")
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+os.environ.setdefault('BINANCE_API_KEY', 'test')  # config exige claves aunque aquí no se usen
+os.environ.setdefault('BINANCE_API_SECRET', 'test')
+from binance_account import AccountSnapshot  # noqa: E402
+from kline_store import KlineStore  # noqa: E402
+from market_stream import MarketStream  # noqa: E402
+from user_stream import UserDataStream  # noqa: E402
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+PERIOD = 1_800_000  # 30m en ms
+START = 1_700_000_000_000
+
+
+class StandInServer:
+    """Servidor WebSocket mínimo (solo envío de texto): acepta una conexión y emite los mensajes dados"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.paths = []
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(1)
+        self.url = f"ws://127.0.0.1:{self.sock.getsockname()[1]}"
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.sock.accept()
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        lines = request.decode().split("\r\n")
+        self.paths.append(lines[0].split()[1])
+        key = next(line.split(":", 1)[1].strip() for line in lines if line.lower().startswith("sec-websocket-key"))
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        conn.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        time.sleep(0.3)  # Dejar que el cliente haga su resincronización inicial
+        for message in self.messages:
+            conn.sendall(self._frame(json.dumps(message).encode()))
+        try:
+            conn.recv(1024)  # Hasta que el cliente cierre
+        except OSError:
+            pass
+        conn.close()
+
+    def _frame(self, payload):
+        if len(payload) < 126:
+            header = struct.pack("!BB", 0x81, len(payload))
+        elif len(payload) < 65536:
+            header = struct.pack("!BBH", 0x81, 126, len(payload))
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, len(payload))
+        return header + payload
+
+    def close(self):
+        self.sock.close()
+
+
+def rest_row(i, close):
+    t = START + i * PERIOD
+    return [t, "100", "101", "99", str(close), "10", t + PERIOD - 1, "1000", 5, "5", "500", "0"]
+
+
+class FakeRest:
+    """REST mínimo para la resincronización (klines, cuenta y listenKey)"""
+
+    def __init__(self, n):
+        self.rows = [rest_row(i, 100 + i) for i in range(n)]
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        rows = [r for r in self.rows if startTime is None or r[0] >= startTime]
+        return rows[-limit:]
+
+    def get_account(self):
+        return {'updateTime': START, 'balances': [{'asset': 'USDC', 'free': '1000', 'locked': '0'},
+                                                  {'asset': 'SOL', 'free': '0', 'locked': '0'}]}
+
+    def stream_get_listen_key(self):
+        return "test-listen-key"
+
+    def stream_keepalive(self, listenKey):
+        pass
+
+    def stream_close(self, listenKey):
+        pass
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_market_stream_applies_klines_and_tickers():
+    rest = FakeRest(20)
+    store = KlineStore(rest, limit=20)
+    last = rest.rows[-1]
+    kline = {'e': 'kline', 's': 'SOLUSDC', 'k': {
+        't': last[0] + PERIOD, 'T': last[6] + PERIOD, 'i': '30m', 'o': '120', 'h': '125', 'l': '119',
+        'c': '124.5', 'v': '3', 'q': '370', 'n': 2, 'V': '1', 'Q': '120', 'x': False}}
+    ticker = {'e': '24hrMiniTicker', 's': 'SOLUSDC', 'E': last[0], 'o': '110', 'c': '124.5'}
+    server = StandInServer([{'stream': 'solusdc@kline_30m', 'data': kline},
+                            {'stream': 'solusdc@miniTicker', 'data': ticker}])
+    stream = MarketStream(store, ['SOLUSDC'], ['30m'], url=server.url)
+    seen = []
+    stream.on_kline = lambda symbol, interval, row, closed: seen.append((symbol, interval, closed))
+    stream.start()
+    try:
+        assert wait_for(lambda: seen), "no llegó la vela"
+        window = store.peek('SOLUSDC', '30m')
+        assert window['open_time'][-1] == kline['k']['t']
+        assert window['close'][-1] == 124.5
+        assert seen[0] == ('SOLUSDC', '30m', False)
+        assert stream.get_price('SOLUSDC') == 124.5
+        assert server.paths[0] == "/stream?streams=solusdc@kline_30m/solusdc@miniTicker"
+    finally:
+        stream.stop()
+        server.close()
+
+
+def test_user_stream_applies_fills_without_double_counting():
+    rest = FakeRest(1)
+    snapshot = AccountSnapshot(rest)
+    fill_time = START + 1000
+    execution = {'e': 'executionReport', 's': 'SOLUSDC', 'S': 'BUY', 'x': 'TRADE', 'X': 'FILLED',
+                 'l': '2', 'Y': '200', 'n': '0.002', 'N': 'SOL', 'T': fill_time}
+    # ✅ LA POSICIÓN ABSOLUTA POSTERIOR YA INCLUYE EL FILL: NO SE DEBE SUMAR DOS VECES
+    position = {'e': 'outboundAccountPosition', 'u': fill_time,
+                'B': [{'a': 'USDC', 'f': '800', 'l': '0'}, {'a': 'SOL', 'f': '1.998', 'l': '0'}]}
+    late_execution = dict(execution, l='1', Y='100')
+    deposit = {'e': 'balanceUpdate', 'a': 'USDC', 'd': '50'}
+    server = StandInServer([execution, position, late_execution, deposit])
+    stream = UserDataStream(rest, snapshot, url=server.url)
+    reports = []
+    stream.on_execution = reports.append
+    stream.start()
+    try:
+        assert wait_for(lambda: snapshot.get().get('USDC', {}).get('free') == 850.0), snapshot.balances
+        assert snapshot.get()['SOL']['free'] == pytest.approx(1.998)
+        assert len(reports) == 2
+        assert snapshot.stream_backed
+        assert server.paths[0] == "/ws/test-listen-key"
+    finally:
+        stream.stop()
+        server.close()
+
+
+def test_execution_report_is_applied_before_the_position_arrives():
+    snapshot = AccountSnapshot(FakeRest(1))
+    snapshot.get()
+    snapshot.apply_execution({'e': 'executionReport', 's': 'SOLUSDC', 'S': 'SELL', 'x': 'NEW',
+                              'l': '0', 'Y': '0', 'T': START + 1})
+    snapshot.apply_execution({'e': 'executionReport', 's': 'SOLUSDC', 'S': 'BUY', 'x': 'TRADE',
+                              'l': '1', 'Y': '100', 'n': '0.1', 'N': 'USDC', 'T': START + 2})
+    balances = snapshot.get()
+    assert balances['USDC']['free'] == pytest.approx(899.9)
+    assert balances['SOL']['free'] == pytest.approx(1.0)